@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+
+from django.views import View
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+from django.utils.cache import get_conditional_response
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+)
+
+from core import caching
+from core.metrics import record_cache_lookup
+from core.settings import RESPONSE_CACHE_SETTINGS
+
+
+# Serves the list and retrieve actions of `viewset_class` on Django's async
+# views. Authentication, permissions, queryset, filters, pagination and the
+# serializer are all taken from the viewset, and so are the response cache of
+# caching.CachedResponseMixin and the validators of ConditionalResponseMixin,
+# so both endpoints always answer alike. Only the queries of the page or the
+# object go through the async ORM, so a worker keeps serving other clients
+# while a request waits on the database. Authentication, filtering and the
+# validator lookups may run queries of their own and are called in a thread.
+class AsyncReadView(View):
+    http_method_names = ["get", "head", "options"]
+
+    viewset_class = None
+    renderer_class = JSONRenderer
+
+    async def get(self, request, pk=None):
+        viewset = self.get_viewset(request, pk)
+        request = viewset.request
+        try:
+            await sync_to_async(viewset.check_permissions)(request)
+            if isinstance(viewset, caching.CachedResponseMixin):
+                return await self.get_cached_response(viewset, pk)
+            if isinstance(viewset, caching.ConditionalResponseMixin):
+                return await self.get_conditional_response(viewset, pk)
+            return self.render(await self.get_data(viewset, pk))
+        except Http404:
+            return self.handle_exception(viewset, NotFound())
+        except APIException as error:
+            return self.handle_exception(viewset, error)
+
+    def get_viewset(self, request, pk):
+        action = "list" if pk is None else "retrieve"
+        viewset = self.viewset_class(
+            action=action, action_map={"get": action}, format_kwarg=None
+        )
+        viewset.args = ()
+        viewset.kwargs = {} if pk is None else {viewset.lookup_field: pk}
+        viewset.request = viewset.initialize_request(request)
+        return viewset
+
+    async def get_data(self, viewset, pk):
+        if pk is None:
+            return await self.list(viewset)
+        return await self.retrieve(viewset, pk)
+
+    async def list(self, viewset):
+        get_atomic = getattr(viewset, "get_list_atomic", None)
+        if get_atomic is not None and get_atomic() is not None:
+            # filtering and the page have to share a transaction, which only
+            # a single sync call can hold.
+            return await sync_to_async(self.list_atomic)(viewset)
+
+        queryset = await sync_to_async(viewset.filter_queryset)(viewset.get_queryset())
+        page = await viewset.paginator.apaginate_queryset(
+            queryset, viewset.request, viewset
+        )
+        serializer = viewset.get_serializer(page, many=True)
+        return viewset.get_paginated_response(serializer.data).data
+
+    def list_atomic(self, viewset):
+        with viewset.get_list_atomic():
+            queryset = viewset.filter_queryset(viewset.get_queryset())
+            page = viewset.paginate_queryset(queryset)
+            serializer = viewset.get_serializer(page, many=True)
+            return viewset.get_paginated_response(serializer.data).data
+
+    async def retrieve(self, viewset, pk):
+        try:
+            instance = await viewset.get_queryset().aget(**{viewset.lookup_field: pk})
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise NotFound()
+        viewset.check_object_permissions(viewset.request, instance)
+        return viewset.get_serializer(instance).data
+
+    async def get_cached_response(self, viewset, pk):
+        request = viewset.request
+        cache = caching.get_cache()
+        key = await sync_to_async(caching.get_response_key)(
+            viewset.get_queryset().model, request
+        )
+
+        cached = await cache.aget(key)
+        record_cache_lookup(cached is not None)
+        if cached is None:
+            data = await self.get_data(viewset, pk)
+            cached = (data, caching.make_etag(data))
+            await cache.aset(key, cached, timeout=RESPONSE_CACHE_SETTINGS["timeout"])
+
+        data, etag = cached
+        if caching.etag_matches(request, etag):
+            return HttpResponseNotModified(headers={"ETag": etag})
+        return self.render(data, headers={"ETag": etag})
+
+    async def get_conditional_response(self, viewset, pk):
+        request = viewset.request
+        if pk is None:
+            state = await sync_to_async(viewset.get_list_state)(request)
+            if state is None:
+                return self.render(await self.get_data(viewset, pk))
+            etag, timestamp = caching.get_state_etag(request, state), None
+        else:
+            get_last_modified = sync_to_async(viewset.get_object_last_modified)
+            last_modified = await get_last_modified(request)
+            if last_modified is None:
+                return self.render(await self.get_data(viewset, pk))
+            etag, timestamp = caching.get_validators(request, last_modified)
+
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = self.render(await self.get_data(viewset, pk))
+        response.headers["ETag"] = etag
+        if timestamp is not None:
+            response.headers["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def handle_exception(self, viewset, error):
+        # the same status and headers as APIView.handle_exception.
+        headers = {}
+        if isinstance(error, (NotAuthenticated, AuthenticationFailed)):
+            authenticate_header = viewset.get_authenticate_header(viewset.request)
+            if authenticate_header:
+                headers["WWW-Authenticate"] = authenticate_header
+            else:
+                error.status_code = status.HTTP_403_FORBIDDEN
+
+        detail = error.detail
+        if not isinstance(detail, (list, dict)):
+            detail = {"detail": detail}
+        return self.render(detail, status_code=error.status_code, headers=headers)
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        return HttpResponse(
+            self.renderer_class().render(data),
+            status=status_code,
+            content_type="application/json",
+            headers=headers,
+        )
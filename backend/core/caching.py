@@ -0,0 +1,154 @@
+import json
+import time
+import hashlib
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.utils.cache import get_conditional_response
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.metrics import record_cache_lookup
+from core.settings import RESPONSE_CACHE_SETTINGS
+
+
+def get_cache():
+    return caches[RESPONSE_CACHE_SETTINGS["alias"]]
+
+
+def get_version_key(model):
+    return f"response-version:{model._meta.label_lower}"
+
+
+def get_version(model):
+    cache = get_cache()
+    key = get_version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # a lost version starts from the clock, never from a number that
+        # older responses may still be stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(model):
+    cache = get_cache()
+    key = get_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def get_response_key(model, request):
+    url = request.build_absolute_uri().encode("utf-8")
+    digest = hashlib.md5(url, usedforsecurity=False).hexdigest()
+    return f"response:{model._meta.label_lower}:{get_version(model)}:{digest}"
+
+
+def make_etag(data):
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return quote_etag(
+        hashlib.md5(content.encode("utf-8"), usedforsecurity=False).hexdigest()
+    )
+
+
+def etag_matches(request, etag):
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    return etag in if_none_match or "*" in if_none_match
+
+
+def get_state_etag(request, state):
+    # the representation also depends on the host and the renderer.
+    return make_etag(
+        [request.build_absolute_uri(), request.headers.get("Accept", ""), state]
+    )
+
+
+def get_validators(request, last_modified):
+    etag = get_state_etag(request, last_modified.isoformat())
+    return etag, int(last_modified.timestamp())
+
+
+# Caches the serialized data of list and retrieve responses under a key that
+# holds the model's version, bumping the version on writes drops every cached
+# page of that model at once. Authentication and permissions still run before
+# the cache is read, only the query and serialization are skipped.
+class CachedResponseMixin:
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        model = self.get_queryset().model
+        key = get_response_key(model, request)
+
+        cached = cache.get(key)
+        record_cache_lookup(cached is not None)
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = (response.data, make_etag(response.data))
+            cache.set(key, cached, timeout=RESPONSE_CACHE_SETTINGS["timeout"])
+
+        data, etag = cached
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(data, headers={"ETag": etag})
+
+
+# Answers If-None-Match and If-Modified-Since from validators the view reads
+# with a single indexed lookup, so an unchanged resource gets a 304 before its
+# queryset is evaluated or serialized. Lists are only validated by an ETag
+# over their state, a timestamp can't tell that a row was deleted.
+class ConditionalResponseMixin:
+    def get_list_state(self, request):
+        raise NotImplementedError(
+            {f"Class {type(self).__name__}": "get_list_state not implemented."}
+        )
+
+    def get_object_last_modified(self, request):
+        raise NotImplementedError(
+            {
+                f"Class {type(self).__name__}": "get_object_last_modified not implemented."
+            }
+        )
+
+    def list(self, request, *args, **kwargs):
+        state = self.get_list_state(request)
+        if state is None:
+            return super().list(request, *args, **kwargs)
+        return self.get_conditional_response(
+            super().list, get_state_etag(request, state), None, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        last_modified = self.get_object_last_modified(request)
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+        etag, timestamp = get_validators(request, last_modified)
+        return self.get_conditional_response(
+            super().retrieve, etag, timestamp, request, *args, **kwargs
+        )
+
+    def get_conditional_response(
+        self, handler, etag, timestamp, request, *args, **kwargs
+    ):
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response.headers["ETag"] = etag
+        if timestamp is not None:
+            response.headers["Last-Modified"] = http_date(timestamp)
+        return response
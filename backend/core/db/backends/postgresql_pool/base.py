@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+
+import psycopg2.extras
+
+from django.db.backends.postgresql import base
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from core.db.pool import ConnectionPool, close_pool, get_pool
+from core.db.backends.postgresql_pool.creation import DatabaseCreation
+from core.settings import DATABASE_POOL_SETTINGS
+
+
+# PostgreSQL backend that borrows connections from a per process pool and
+# hands them back on close, so requests with CONN_MAX_AGE = 0 skip the
+# connection setup without each thread holding its own connection open.
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    # the pool the open connection was taken from, close_pool may have
+    # dropped it or replaced it with a new one by the time it's returned.
+    connection_pool = None
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(
+            self.alias,
+            lambda: ConnectionPool(
+                min_size=DATABASE_POOL_SETTINGS["min_size"],
+                max_size=DATABASE_POOL_SETTINGS["max_size"],
+                timeout=DATABASE_POOL_SETTINGS["timeout"],
+                health_checks=self.settings_dict["CONN_HEALTH_CHECKS"],
+                **conn_params,
+            ),
+        )
+        connection = pool.getconn()
+        self.connection_pool = pool
+
+        options = self.settings_dict["OPTIONS"]
+        self.isolation_level = IsolationLevel.READ_COMMITTED
+        if "isolation_level" in options:
+            self.isolation_level = IsolationLevel(options["isolation_level"])
+            connection.isolation_level = self.isolation_level
+        # same as the postgresql backend, JSONField decodes the values itself.
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                return self.connection_pool.putconn(self.connection)
+
+    @contextmanager
+    def _nodb_cursor(self):
+        # the connection to the postgres database is only needed briefly, by
+        # test database creation and the version lookup, its pool isn't kept.
+        try:
+            with super()._nodb_cursor() as cursor:
+                yield cursor
+        finally:
+            close_pool(NO_DB_ALIAS)
@@ -0,0 +1,15 @@
+from django.db.backends.postgresql import creation
+
+from core.db.pool import close_pool
+
+
+# idle pooled connections would keep the test database open, and ones opened
+# before it was created still point at the main database.
+class DatabaseCreation(creation.DatabaseCreation):
+    def _create_test_db(self, verbosity, autoclobber, keepdb=False):
+        close_pool(self.connection.alias)
+        return super()._create_test_db(verbosity, autoclobber, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pool(self.connection.alias)
+        return super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,85 @@
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from core.settings import DATABASE_REPLICA_SETTINGS
+from core.db.routers import REPLICA_ALIASES, choose_replica, read_alias
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def get_sticky_key(request):
+    # clients are told apart by their credentials, anonymous requests only
+    # stick for their own duration.
+    credentials = request.headers.get("Authorization")
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+    return f"replica-sticky:{digest}"
+
+
+# Enables replica reads for safe requests. Unsafe requests run entirely on
+# the primary and mark their client sticky, so its reads keep going to the
+# primary for `sticky_seconds` and see its own writes despite replica lag.
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cache = caches[DATABASE_REPLICA_SETTINGS["cache_alias"]]
+        # a write served by one worker has to make the next read of its
+        # client stick to the primary whichever worker serves that read.
+        if REPLICA_ALIASES and isinstance(self.cache, (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                "DB_REPLICA_URLS needs a cache shared by all workers, set "
+                "DB_REPLICA_CACHE_ALIAS to one (see CACHE_URL), "
+                f"not {type(self.cache).__name__}."
+            )
+        self.timeout = DATABASE_REPLICA_SETTINGS["sticky_seconds"]
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not REPLICA_ALIASES:
+            return self.get_response(request)
+
+        key = get_sticky_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if key is not None:
+                self.cache.set(key, True, timeout=self.timeout)
+            return response
+
+        sticky = key is not None and self.cache.get(key) is not None
+        token = read_alias.set(None if sticky else choose_replica())
+        try:
+            return self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+    async def __acall__(self, request):
+        if not REPLICA_ALIASES:
+            return await self.get_response(request)
+
+        key = get_sticky_key(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if key is not None:
+                await self.cache.aset(key, True, timeout=self.timeout)
+            return response
+
+        sticky = key is not None and await self.cache.aget(key) is not None
+        token = read_alias.set(None if sticky else choose_replica())
+        try:
+            return await self.get_response(request)
+        finally:
+            read_alias.reset(token)
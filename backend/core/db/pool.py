@@ -0,0 +1,174 @@
+import time
+import threading
+import collections
+
+import psycopg2
+
+from psycopg2 import OperationalError, extensions
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    # Keeps up to `max_size` connections of a process open, returned ones
+    # wait on an idle stack for the next checkout (the most recently used
+    # first, they are the least likely to have gone stale). `min_size` of
+    # them are opened with the pool, the rest when first needed. Callers wait
+    # up to `timeout` seconds for a connection once all of them are taken.
+
+    def __init__(self, min_size, max_size, timeout, health_checks, **conn_params):
+        self.conn_params = conn_params
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_checks = health_checks
+
+        self.condition = threading.Condition()
+        self.idle = collections.deque()
+        self.size = 0
+        self.in_use = 0
+        self.closed = False
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+
+        for _ in range(min(min_size, max_size)):
+            self.idle.append(self.connect())
+            self.size += 1
+
+    def connect(self):
+        return psycopg2.connect(**self.conn_params)
+
+    def getconn(self):
+        started = time.monotonic()
+        waited = False
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                waited = True
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise OperationalError(
+                        f"no database connection available after {self.timeout}s."
+                    )
+                self.condition.wait(remaining)
+
+            connection = self.idle.pop() if self.idle else None
+            if connection is None:
+                self.size += 1
+            self.in_use += 1
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += time.monotonic() - started
+
+        # connecting and health checks happen outside the lock, the slot is
+        # already taken.
+        try:
+            if connection is not None and not self.is_usable(connection):
+                self.discard(connection)
+                with self.condition:
+                    self.discarded += 1
+                connection = None
+            if connection is None:
+                connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        return connection
+
+    def putconn(self, connection):
+        # rolls back an open transaction, closes a broken connection.
+        usable = not connection.closed and not self.closed
+        if usable:
+            status = connection.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                usable = False
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    connection.rollback()
+                except Exception:
+                    usable = False
+        if not usable:
+            self.discard(connection)
+
+        with self.condition:
+            self.in_use -= 1
+            if usable:
+                self.idle.append(connection)
+            else:
+                self.size -= 1
+            self.condition.notify()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        # in use connections are closed when they are returned.
+        with self.condition:
+            self.closed = True
+            idle = list(self.idle)
+            self.idle.clear()
+            self.size -= len(idle)
+        for connection in idle:
+            self.discard(connection)
+
+    def is_usable(self, connection):
+        if connection.closed:
+            return False
+        status = connection.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if not self.health_checks:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            # ends the transaction the check opened outside autocommit.
+            connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def stats(self):
+        with self.condition:
+            return {
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "idle": len(self.idle),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+            }
+
+
+def get_pool(alias, create):
+    pool = pools.get(alias)
+    if pool is None:
+        with pools_lock:
+            pool = pools.get(alias)
+            if pool is None:
+                pool = pools[alias] = create()
+    return pool
+
+
+def close_pool(alias):
+    with pools_lock:
+        pool = pools.pop(alias, None)
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats():
+    return {alias: pool.stats() for alias, pool in list(pools.items())}
@@ -0,0 +1,58 @@
+import random
+import contextlib
+import contextvars
+
+from django.db import connections
+
+from core.settings import DATABASES
+
+
+REPLICA_ALIASES = [alias for alias in DATABASES if alias != "default"]
+# only the catalog is read from the replicas, authentication must see tokens
+# and users the moment they are written.
+REPLICA_APP_LABELS = {"library_system"}
+
+# one replica per request, so its queries see the same snapshot and session.
+read_alias = contextvars.ContextVar("read_alias", default=None)
+
+
+def choose_replica():
+    if not REPLICA_ALIASES:
+        return None
+    return random.choice(REPLICA_ALIASES)
+
+
+@contextlib.contextmanager
+def use_replica(alias=None):
+    token = read_alias.set(alias or choose_replica())
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+# Sends catalog reads to the replica chosen for the current context, which
+# ReplicaRoutingMiddleware does for safe requests of clients that haven't
+# written recently. Everything else goes to the primary, that includes reads
+# inside a transaction (circulation, imports, reviews) and reads outside of
+# requests unless they're wrapped in use_replica().
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if (
+            alias is None
+            or model._meta.app_label not in REPLICA_APP_LABELS
+            or connections["default"].in_atomic_block
+        ):
+            return "default"
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == "default"
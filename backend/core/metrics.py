@@ -0,0 +1,248 @@
+import copy
+import time
+import bisect
+import threading
+import contextvars
+
+from django.dispatch import receiver
+from django.db.backends.signals import connection_created
+
+from core.settings import METRICS_SETTINGS
+from core.db.pool import pool_stats
+
+from user_auth.authentication import token_cache
+
+
+# per request counters, read by MetricsMiddleware when the response is done.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "query_seconds", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_seconds += time.perf_counter() - start
+
+
+# Connections are per thread and the async ORM queries from a thread of its
+# own, so the recorder stays installed on every connection and finds the
+# request through the context, which is copied into those threads.
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache_lookup(hit):
+    metrics = current_request.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        cumulative = 0
+        for bucket, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            yield format_value(bucket), cumulative
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.latency = Histogram(METRICS_SETTINGS["latency_buckets"])
+        self.queries = Histogram(METRICS_SETTINGS["query_buckets"])
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+# Keeps the metrics of each (view, method, status) in this process. Every
+# worker has its own registry, Prometheus should scrape each of them or the
+# server should run a single worker per container.
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, labels, duration, metrics, response_bytes):
+        with self.lock:
+            endpoint = self.endpoints.get(labels)
+            if endpoint is None:
+                endpoint = self.endpoints[labels] = EndpointMetrics()
+            endpoint.latency.observe(duration)
+            endpoint.queries.observe(metrics.queries)
+            endpoint.query_seconds += metrics.query_seconds
+            endpoint.response_bytes += response_bytes
+            endpoint.cache_hits += metrics.cache_hits
+            endpoint.cache_misses += metrics.cache_misses
+
+    def collect(self):
+        with self.lock:
+            return copy.deepcopy(list(self.endpoints.items()))
+
+
+registry = Registry()
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"),
+        )
+        for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+class Exposition:
+    # collects samples grouped by metric, in the Prometheus text format.
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.families = {}
+
+    def add(self, name, kind, help_text, value, suffix="", **labels):
+        family = self.families.setdefault(
+            name, {"kind": kind, "help": help_text, "samples": []}
+        )
+        family["samples"].append((suffix, labels, value))
+
+    def add_histogram(self, name, help_text, histogram, **labels):
+        for bucket, count in histogram.samples():
+            self.add(
+                name, "histogram", help_text, count, "_bucket", **labels, le=bucket
+            )
+        self.add(name, "histogram", help_text, histogram.sum, "_sum", **labels)
+        self.add(name, "histogram", help_text, histogram.count, "_count", **labels)
+
+    def render(self):
+        lines = []
+        for name, family in self.families.items():
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {family['help']}")
+            lines.append(f"# TYPE {full_name} {family['kind']}")
+            for suffix, labels, value in family["samples"]:
+                lines.append(
+                    f"{full_name}{suffix}{format_labels(labels)} {format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def render_metrics():
+    exposition = Exposition(METRICS_SETTINGS["prefix"])
+    for (view, method, status), endpoint in registry.collect():
+        labels = {"view": view, "method": method, "status": status}
+        exposition.add_histogram(
+            "http_request_duration_seconds",
+            "Time spent producing the response.",
+            endpoint.latency,
+            **labels,
+        )
+        exposition.add_histogram(
+            "db_queries_per_request",
+            "SQL queries issued by a request.",
+            endpoint.queries,
+            **labels,
+        )
+        exposition.add(
+            "db_query_duration_seconds_total",
+            "counter",
+            "Time spent executing SQL queries.",
+            endpoint.query_seconds,
+            **labels,
+        )
+        exposition.add(
+            "http_response_bytes_total",
+            "counter",
+            "Size of the response bodies, streamed bodies are not counted.",
+            endpoint.response_bytes,
+            **labels,
+        )
+        for result, value in (
+            ("hit", endpoint.cache_hits),
+            ("miss", endpoint.cache_misses),
+        ):
+            exposition.add(
+                "response_cache_lookups_total",
+                "counter",
+                "Response cache lookups.",
+                value,
+                **labels,
+                result=result,
+            )
+
+    for result, value in (("hit", token_cache.hits), ("miss", token_cache.misses)):
+        exposition.add(
+            "token_cache_lookups_total",
+            "counter",
+            "Token cache lookups in this process.",
+            value,
+            result=result,
+        )
+
+    for alias, stats in pool_stats().items():
+        for state in ("in_use", "idle"):
+            exposition.add(
+                "db_pool_connections",
+                "gauge",
+                "Pooled database connections.",
+                stats[state],
+                alias=alias,
+                state=state,
+            )
+        exposition.add(
+            "db_pool_max_connections",
+            "gauge",
+            "Size limit of the pool.",
+            stats["max_size"],
+            alias=alias,
+        )
+        for name, key, help_text in (
+            ("db_pool_checkouts_total", "checkouts", "Connections taken."),
+            ("db_pool_waits_total", "waits", "Checkouts that had to wait."),
+            ("db_pool_wait_seconds_total", "wait_seconds", "Time spent waiting."),
+            ("db_pool_timeouts_total", "timeouts", "Checkouts that timed out."),
+            ("db_pool_discarded_total", "discarded", "Broken connections dropped."),
+        ):
+            exposition.add(name, "counter", help_text, stats[key], alias=alias)
+
+    return exposition.render()
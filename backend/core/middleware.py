@@ -0,0 +1,77 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.db import connections
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import metrics
+from core.settings import METRICS_SETTINGS
+
+
+def get_labels(request, response):
+    match = getattr(request, "resolver_match", None)
+    view = match.view_name if match is not None else "unmatched"
+    return view, request.method, str(response.status_code)
+
+
+def get_response_bytes(response):
+    if response.streaming:
+        return 0
+    return len(response.content)
+
+
+# Times each request and counts its SQL queries through metrics.record_query,
+# the results are kept by metrics.registry under the route name, which for
+# viewsets includes the action.
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not METRICS_SETTINGS["enabled"]:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+        start = time.perf_counter()
+        # connections opened before this module was imported missed the
+        # connection_created signal.
+        for alias in connections:
+            metrics.install_query_recorder(None, connections[alias])
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+
+        metrics.registry.record(
+            get_labels(request, response),
+            time.perf_counter() - start,
+            request_metrics,
+            get_response_bytes(response),
+        )
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.current_request.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+
+        metrics.registry.record(
+            get_labels(request, response),
+            time.perf_counter() - start,
+            request_metrics,
+            get_response_bytes(response),
+        )
+        return response
@@ -0,0 +1,228 @@
+import json
+import base64
+import binascii
+import datetime
+
+from asgiref.sync import sync_to_async
+
+from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.pagination import BasePagination, PageNumberPagination
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts datetimes to milliseconds, a cursor has to keep
+    # the exact value it seeks from.
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+# Seeks on the current ordering field plus the primary key instead of using
+# OFFSET, so a page costs one range scan over the matching (field, id) index
+# and no COUNT(*). NULLs sort as the greatest value, like PostgreSQL's default,
+# and rows with a NULL field are paged as a segment of their own after (or,
+# descending, before) the others, so the seek filter on each segment stays a
+# bounded range. Clients that need the total count can pass `page` to get
+# PageNumberPagination.
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    page_query_param = "page"
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count_paginator = None
+        if self.page_query_param in request.query_params:
+            self.count_paginator = PageNumberPagination()
+            self.count_paginator.page_size = self.page_size
+            if not queryset.ordered:
+                queryset = queryset.order_by("pk")
+            return self.count_paginator.paginate_queryset(queryset, request, view)
+
+        # one extra row tells finish_page whether another page follows.
+        results = []
+        for segment in self.get_segments(queryset, request):
+            results.extend(segment[: self.page_size + 1 - len(results)])
+            if len(results) > self.page_size:
+                break
+        return self.finish_page(results)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # the page number mode runs a COUNT through the sync paginator.
+        if self.page_query_param in request.query_params:
+            return await sync_to_async(self.paginate_queryset)(queryset, request, view)
+
+        results = []
+        for segment in self.get_segments(queryset, request):
+            results.extend(
+                [
+                    instance
+                    async for instance in segment[: self.page_size + 1 - len(results)]
+                ]
+            )
+            if len(results) > self.page_size:
+                break
+        return self.finish_page(results)
+
+    def get_segments(self, queryset, request):
+        # the querysets to read in order until the page is full, the one
+        # holding the cursor position is bounded by the seek filter.
+        self.request = request
+        self.count_paginator = None
+        self.field, self.descending = self.get_ordering(queryset)
+        self.position, self.reverse = self.decode_cursor(request, queryset)
+
+        descending = self.descending != self.reverse
+        pk_order = "-pk" if descending else "pk"
+        if self.field == "pk":
+            if self.position is not None:
+                queryset = queryset.filter(
+                    self.get_pk_filter(descending, self.position[1])
+                )
+            return [queryset.order_by(pk_order)]
+
+        segments = [
+            (
+                False,
+                queryset.filter(**{f"{self.field}__isnull": False}).order_by(
+                    f"-{self.field}" if descending else self.field, pk_order
+                ),
+            )
+        ]
+        # the nullability of annotations isn't known, they may be NULL.
+        field = self.get_field(queryset, self.field)
+        if field.null or self.field in queryset.query.annotations:
+            nulls = queryset.filter(**{f"{self.field}__isnull": True})
+            segments.insert(0 if descending else 1, (True, nulls.order_by(pk_order)))
+
+        if self.position is not None:
+            # segments before the one holding the position are already paged.
+            value, pk = self.position
+            while segments and segments[0][0] != (value is None):
+                segments.pop(0)
+            if not segments:
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                seek = self.get_pk_filter(descending, pk)
+            else:
+                seek = self.get_seek_filter(self.field, descending, value, pk)
+            segments[0] = (segments[0][0], segments[0][1].filter(seek))
+        return [segment for _, segment in segments]
+
+    def finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.next_position = self.previous_position = None
+        if results:
+            if has_more or self.reverse:
+                self.next_position = self.get_position(results[-1])
+            if (has_more and self.reverse) or (
+                self.position is not None and not self.reverse
+            ):
+                self.previous_position = self.get_position(results[0])
+        return results
+
+    def get_paginated_response(self, data):
+        if self.count_paginator is not None:
+            return self.count_paginator.get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_ordering(self, queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        field = ordering[0] if ordering and isinstance(ordering[0], str) else "pk"
+        descending = field.startswith("-")
+        field = field.lstrip("-")
+        if field == queryset.model._meta.pk.name:
+            field = "pk"
+        return field, descending
+
+    def get_pk_filter(self, descending, pk):
+        return Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+
+    def get_seek_filter(self, field, descending, value, pk):
+        # (field, pk) past (value, pk) written so that the first condition
+        # bounds the scan of the (field, id) index.
+        if descending:
+            return Q(**{f"{field}__lte": value}) & (
+                Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)
+            )
+        return Q(**{f"{field}__gte": value}) & (
+            Q(**{f"{field}__gt": value}) | Q(pk__gt=pk)
+        )
+
+    def get_position(self, instance):
+        value = instance.pk if self.field == "pk" else getattr(instance, self.field)
+        return value, instance.pk
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            field, value, pk, reverse = cursor
+        except (TypeError, ValueError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if field != self.field or not isinstance(reverse, bool):
+            raise NotFound(self.invalid_cursor_message)
+
+        # the values end up in filters, anything the fields can't parse
+        # would fail there.
+        try:
+            pk = self.clean_value(queryset.model._meta.pk, pk)
+            if value is not None:
+                value = self.clean_value(self.get_field(queryset, field), value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if pk is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), reverse
+
+    def get_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == "pk":
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def clean_value(self, field, value):
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise ValueError(value)
+        return field.to_python(value)
+
+    def encode_cursor(self, position, reverse):
+        cursor = json.dumps([self.field, *position, reverse], cls=CursorEncoder)
+        encoded = base64.urlsafe_b64encode(cursor.encode("ascii")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "rest_framework",
     "knox",
     # django apps
+    "django.contrib.postgres",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.db.middleware.ReplicaRoutingMiddleware",
 ]
 
 TEMPLATES = [
@@ -94,15 +97,46 @@ AUTHENTICATION_BACKENDS = [
     "user_auth.backends.EmailBackend",
 ]
 
+# Django picks the hasher by algorithm name, stored pbkdf2_sha256 hashes are
+# verified by the profiled hasher and upgraded to its iteration count on
+# the next successful login. Measure candidates with `benchmark_hashers`.
+PASSWORD_HASHERS = [
+    "user_auth.hashers.ProfiledPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+PASSWORD_HASHER_SETTINGS = {
+    "pbkdf2_iterations": env.int("PBKDF2_ITERATIONS", default=600000),
+}
+
+SIGNED_CREDENTIAL_SETTINGS = {
+    "salt": "user_auth.signed_credential",
+    "max_age": timedelta(minutes=env.int("SIGNED_CREDENTIAL_MINUTES", default=15)),
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
+        "user_auth.authentication.SignedCredentialAuthentication",
         "user_auth.authentication.UsernameAuthentication",
         "user_auth.authentication.EmailAuthentication",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
     "PAGE_SIZE": 20,
 }
 
+TOKEN_CACHE_SETTINGS = {
+    "max_size": env.int("TOKEN_CACHE_MAX_SIZE", default=4096),
+    "ttl": env.int("TOKEN_CACHE_TTL", default=60),
+}
+
+TOKEN_PURGE_SETTINGS = {
+    "batch_size": env.int("TOKEN_PURGE_BATCH_SIZE", default=1000),
+    "max_tokens_per_user": env.int("MAX_TOKENS_PER_USER", default=0),
+}
+
 REST_KNOX = {
     "SECURE_HASH_ALGORITHM": "cryptography.hazmat.primitives.hashes.SHA512",
     "AUTH_TOKEN_CHARACTER_LENGTH": 64,
@@ -113,9 +147,67 @@ REST_KNOX = {
     "EXPIRY_DATETIME_FORMAT": api_settings.DATETIME_FORMAT,
 }
 
+DATABASE_POOL_SETTINGS = {
+    "enabled": env.bool("DB_POOL", default=False),
+    "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+    "max_size": env.int("DB_POOL_MAX_SIZE", default=10),
+    "timeout": env.float("DB_POOL_TIMEOUT", default=5.0),
+    # PgBouncer in transaction mode hands each transaction to any server
+    # connection, session state like server side cursors can't be relied on.
+    "transaction_pooler": env.bool("DB_TRANSACTION_POOLER", default=False),
+}
+
+DATABASE_REPLICA_SETTINGS = {
+    "urls": env.list("DB_REPLICA_URLS", default=[]),
+    # after a write the same client reads from the primary for this long,
+    # it should cover the replication lag.
+    "sticky_seconds": env.int("DB_REPLICA_STICKY_SECONDS", default=5),
+    # keeps the sticky clients, it must be shared by all workers.
+    "cache_alias": env("DB_REPLICA_CACHE_ALIAS", default="default"),
+}
+
 DATABASES = {
     "default": env.db(),
 }
+for index, url in enumerate(DATABASE_REPLICA_SETTINGS["urls"], start=1):
+    # tests run the replicas against the test primary.
+    DATABASES[f"replica_{index}"] = {
+        **env.db_url_config(url),
+        "TEST": {"MIRROR": "default"},
+    }
+
+for database in DATABASES.values():
+    database["CONN_MAX_AGE"] = env.int("DB_CONN_MAX_AGE", default=60)
+    database["CONN_HEALTH_CHECKS"] = env.bool("DB_CONN_HEALTH_CHECKS", default=True)
+    if (
+        DATABASE_POOL_SETTINGS["enabled"]
+        and database["ENGINE"] == "django.db.backends.postgresql"
+    ):
+        # connections go back to the pool at the end of each request.
+        database["ENGINE"] = "core.db.backends.postgresql_pool"
+        database["CONN_MAX_AGE"] = 0
+    if DATABASE_POOL_SETTINGS["transaction_pooler"]:
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+DATABASE_ROUTERS = ["core.db.routers.ReplicaRouter"]
+
+# locmemcache:// keeps a cache per worker, a shared backend such as
+# redis://host:6379/0 is shared by all workers and survives restarts.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+RESPONSE_CACHE_SETTINGS = {
+    "alias": env("RESPONSE_CACHE_ALIAS", default="default"),
+    "timeout": env.int("RESPONSE_CACHE_TIMEOUT", default=300),
+}
+
+METRICS_SETTINGS = {
+    "enabled": env.bool("METRICS_ENABLED", default=True),
+    "prefix": "library",
+    "latency_buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    "query_buckets": (0, 1, 2, 5, 10, 20, 50, 100),
+}
 
 AUTH_USER_MODEL = "user_auth.User"
 
@@ -133,6 +225,9 @@ USE_I18N = True
 
 USE_TZ = True
 
+EMAIL_BACKEND = env(
+    "EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend"
+)
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL")
 EMAIL_HOST = env("EMAIL_HOST")
 EMAIL_HOST_USER = env("EMAIL_HOST_USER")
@@ -140,7 +235,18 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
 EMAIL_PORT = env("EMAIL_PORT")
 EMAIL_USE_TLS = True
 
+EMAIL_OUTBOX_SETTINGS = {
+    "batch_size": env.int("EMAIL_OUTBOX_BATCH_SIZE", default=50),
+    "max_attempts": env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", default=8),
+    "retry_delay": timedelta(seconds=env.int("EMAIL_OUTBOX_RETRY_SECONDS", default=30)),
+    "max_retry_delay": timedelta(hours=1),
+}
+
 RESET_TOKEN_SETTINGS = {
     "expiration_time": timezone.timedelta(hours=1),
     "token_length": 20,
 }
+
+LIBRARY_SEARCH_SETTINGS = {
+    "trigram_threshold": env.float("SEARCH_TRIGRAM_THRESHOLD", default=0.3),
+}
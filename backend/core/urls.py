@@ -1,11 +1,16 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import DatabasePoolView, MetricsView
+
 api_patterns = [
     path("", include("user_auth.urls")),
     path("", include("library_system.urls")),
+    path("async/", include("library_system.async_urls")),
+    path("db/pool/", DatabasePoolView.as_view(), name="database-pool"),
 ]
 
 urlpatterns = [
     path("api/", include(api_patterns)),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
@@ -0,0 +1,41 @@
+from django.db import connections
+from django.http import HttpResponse
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+from user_auth.authentication import (
+    CachedTokenAuthentication,
+    SignedCredentialAuthentication,
+)
+
+from core.db.pool import pool_stats
+from core.metrics import render_metrics
+
+
+class DatabasePoolView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
+    permission_classes = [IsAdminUser, IsAuthenticated]
+
+    def get(self, request):
+        # the pools live in this worker process only.
+        databases = {
+            alias: {
+                "engine": connections[alias].settings_dict["ENGINE"],
+                "conn_max_age": connections[alias].settings_dict["CONN_MAX_AGE"],
+                "health_checks": connections[alias].settings_dict["CONN_HEALTH_CHECKS"],
+            }
+            for alias in connections
+        }
+        return Response({"databases": databases, "pools": pool_stats()})
+
+
+class MetricsView(APIView):
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
+    permission_classes = [IsAdminUser, IsAuthenticated]
+
+    def get(self, request):
+        return HttpResponse(
+            render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
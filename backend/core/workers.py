@@ -0,0 +1,10 @@
+from uvicorn.workers import UvicornWorker
+
+
+class LimitedUvicornWorker(UvicornWorker):
+    # uvicorn doesn't read gunicorn's worker_connections, it's passed on as
+    # uvicorn's limit_concurrency: past that many open connections and tasks
+    # the worker answers 503 instead of accepting more work.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.limit_concurrency = self.cfg.worker_connections
@@ -1,5 +1,22 @@
 #!/bin/bash
 
 python manage.py migrate
+# partitions of the loan history for the coming months, best run monthly too.
+python manage.py create_loan_event_partitions
 
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# SERVER_MODE picks the server, worker counts are read by gunicorn.conf.py.
+case "${SERVER_MODE:-development}" in
+    asgi)
+        # sync views run in a new thread per request under asgi, persistent
+        # connections would be left behind by every one of those threads.
+        export DB_CONN_MAX_AGE=0
+        exec gunicorn core.asgi:application --config gunicorn.conf.py \
+            --worker-class core.workers.LimitedUvicornWorker
+        ;;
+    wsgi)
+        exec gunicorn core.wsgi:application --config gunicorn.conf.py
+        ;;
+    *)
+        exec python manage.py runserver 0.0.0.0:8000
+        ;;
+esac
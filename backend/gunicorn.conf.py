@@ -0,0 +1,22 @@
+import os
+import multiprocessing
+
+
+bind = f"0.0.0.0:{os.environ.get('SITE_PORT', '8000')}"
+
+# wsgi workers serve `threads` requests at a time each, asgi workers
+# (core.workers.LimitedUvicornWorker) run one event loop each and accept up
+# to `worker_connections` connections. Under asgi the async views run on the
+# loop, every other (sync) view runs in a thread of its own per request, so
+# `worker_connections` also bounds those threads and their database
+# connections.
+workers = int(os.environ.get("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("WEB_THREADS", 1))
+worker_connections = int(os.environ.get("WEB_CONNECTIONS", 1000))
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 30))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", 5))
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
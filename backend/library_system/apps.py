@@ -7,3 +7,6 @@ app_name = "library_system"
 class LibrarySystemConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = app_name
+
+    def ready(self):
+        from library_system import signals
@@ -0,0 +1,29 @@
+from django.urls import path, include
+
+from core.async_views import AsyncReadView
+
+from library_system.views import (
+    AuthorViewSet,
+    CategoryViewSet,
+    PublicationViewSet,
+    BookViewSet,
+)
+
+
+# the list and retrieve actions of the viewsets, served by async views.
+async_patterns = []
+for prefix, viewset in (
+    ("author", AuthorViewSet),
+    ("category", CategoryViewSet),
+    ("publication", PublicationViewSet),
+    ("book", BookViewSet),
+):
+    view = AsyncReadView.as_view(viewset_class=viewset)
+    async_patterns += [
+        path(f"{prefix}/", view, name=f"async-{prefix}-list"),
+        path(f"{prefix}/<int:pk>/", view, name=f"async-{prefix}-detail"),
+    ]
+
+urlpatterns = [
+    path("library_system/", include(async_patterns)),
+]
@@ -0,0 +1,231 @@
+import json
+import contextlib
+import time
+import random
+import platform
+import statistics
+import tracemalloc
+import urllib.error
+import urllib.request
+
+import django
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.settings import HOST_SETTINGS
+
+from library_system.models import Book, Author
+from library_system.seeding import TITLE_WORDS
+
+
+SYNC_PREFIX = "/api/library_system"
+ASYNC_PREFIX = "/api/async/library_system"
+BENCHMARK_TARGETS = ("sync", "async")
+
+
+class LocalClient:
+    # runs requests in this process through Django's test client.
+    def __init__(self, token):
+        self.client = Client(
+            HTTP_HOST=HOST_SETTINGS["domain"], HTTP_AUTHORIZATION=f"Token {token}"
+        )
+
+    def request(self, method, path):
+        response = getattr(self.client, method)(path)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+
+class ServerClient:
+    # sends requests to a running server, queries and allocations are then
+    # outside this process and aren't measured.
+    def __init__(self, token, base_url):
+        self.headers = {"Authorization": f"Token {token}"}
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path):
+        request = urllib.request.Request(
+            self.base_url + path, method=method.upper(), headers=self.headers
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+
+def percentile(quantiles, value):
+    return round(quantiles[value - 1] * 1000, 3)
+
+
+def summarize(samples, errors):
+    summary = {"requests": len(samples), "errors": errors}
+    if len(samples) > 1:
+        quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+        summary.update(
+            {
+                "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+                "p50_ms": percentile(quantiles, 50),
+                "p95_ms": percentile(quantiles, 95),
+                "p99_ms": percentile(quantiles, 99),
+            }
+        )
+    return summary
+
+
+class ApiBenchmark:
+    # Every scenario is first timed without instrumentation, then a few more
+    # requests run with the queries captured and tracemalloc on, so neither
+    # inflates the latencies. Paths are drawn from a seeded random generator
+    # and vary between requests, the same seed replays the same requests.
+
+    def __init__(self, client, target="sync", requests=200, profile_requests=20):
+        self.client = client
+        self.target = target
+        self.requests = requests
+        self.profile_requests = profile_requests
+        self.local = isinstance(client, LocalClient)
+
+    def get_scenarios(self):
+        # borrow and return only exist on the sync views.
+        prefix = ASYNC_PREFIX if self.target == "async" else SYNC_PREFIX
+        book_ids = list(Book.objects.values_list("pk", flat=True)[:1000])
+        free_book_ids = list(
+            Book.objects.filter(copies_available__gt=0).values_list("pk", flat=True)[
+                :1000
+            ]
+        )
+        author_ids = list(Author.objects.values_list("pk", flat=True)[:1000])
+        if not book_ids or not author_ids:
+            raise ValueError("the catalog is empty, run seed_catalog first.")
+
+        return {
+            "book-list": lambda rng: [("get", f"{prefix}/book/?x={rng.random()}")],
+            "book-list-ordered": lambda rng: [
+                (
+                    "get",
+                    f"{prefix}/book/?ordering=-reviews_star_average&x={rng.random()}",
+                )
+            ],
+            "book-search": lambda rng: [
+                ("get", f"{prefix}/book/?search={rng.choice(TITLE_WORDS)}")
+            ],
+            "book-detail": lambda rng: [
+                ("get", f"{prefix}/book/{rng.choice(book_ids)}/")
+            ],
+            "author-list": lambda rng: [("get", f"{prefix}/author/?x={rng.random()}")],
+            "author-detail": lambda rng: [
+                ("get", f"{prefix}/author/{rng.choice(author_ids)}/")
+            ],
+            "borrow-return": lambda rng: self.borrow_return(rng, free_book_ids),
+        }
+
+    def borrow_return(self, rng, book_ids):
+        if not book_ids:
+            return []
+        book_id = rng.choice(book_ids)
+        return [
+            ("post", f"{SYNC_PREFIX}/book/{book_id}/borrow_book/"),
+            ("post", f"{SYNC_PREFIX}/book/{book_id}/return_book/"),
+        ]
+
+    def run(self, names=None, seed=0):
+        scenarios = self.get_scenarios()
+        results = {}
+        for name, scenario in scenarios.items():
+            if names and name not in names:
+                continue
+            results[name] = self.run_scenario(scenario, random.Random(seed))
+        return results
+
+    def run_scenario(self, scenario, rng):
+        # one warm up round fills the caches a long running worker has.
+        for method, path in scenario(rng):
+            self.client.request(method, path)
+
+        samples = []
+        errors = 0
+        for _ in range(self.requests):
+            for method, path in scenario(rng):
+                start = time.perf_counter()
+                status_code = self.client.request(method, path)
+                samples.append(time.perf_counter() - start)
+                errors += status_code >= 400
+
+        summary = summarize(samples, errors)
+        if self.local and self.profile_requests:
+            summary.update(self.profile(scenario, rng))
+        return summary
+
+    def profile(self, scenario, rng):
+        queries = []
+        allocated = []
+        peaks = []
+        tracemalloc.start()
+        try:
+            for _ in range(self.profile_requests):
+                for method, path in scenario(rng):
+                    with contextlib.ExitStack() as stack:
+                        captured = [
+                            stack.enter_context(
+                                CaptureQueriesContext(connections[alias])
+                            )
+                            for alias in connections
+                        ]
+                        tracemalloc.reset_peak()
+                        before = tracemalloc.get_traced_memory()[0]
+                        self.client.request(method, path)
+                        current, peak = tracemalloc.get_traced_memory()
+                    queries.append(sum(map(len, captured)))
+                    allocated.append(current - before)
+                    peaks.append(peak - before)
+        finally:
+            tracemalloc.stop()
+
+        if not queries:
+            return {}
+        return {
+            "queries_mean": round(statistics.fmean(queries), 2),
+            "queries_max": max(queries),
+            "retained_kib_mean": round(statistics.fmean(allocated) / 1024, 2),
+            "peak_kib_mean": round(statistics.fmean(peaks) / 1024, 2),
+            "peak_kib_max": round(max(peaks) / 1024, 2),
+        }
+
+
+def get_environment(target, base_url, requests, seed):
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connections["default"].vendor,
+        "target": target,
+        "base_url": base_url,
+        "requests": requests,
+        "seed": seed,
+        "books": Book.objects.count(),
+    }
+
+
+def compare(previous, current, keys=("p50_ms", "p95_ms", "p99_ms", "queries_mean")):
+    # relative change of each metric, negative is an improvement.
+    changes = {}
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if before is None:
+            continue
+        changes[name] = {
+            key: round((result[key] - before[key]) / before[key] * 100, 1)
+            for key in keys
+            if result.get(key) is not None and before.get(key)
+        }
+    return changes
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as stream:
+        return json.load(stream)
@@ -0,0 +1,319 @@
+import datetime
+
+from collections import defaultdict, deque
+
+from django.db import transaction
+from django.db.models import F, Exists, Subquery
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from rest_framework import status
+
+from library_system.models import Book, BookInstance, BookReservation, LoanEvent
+
+
+user_model = get_user_model()
+
+LOAN_PERIOD = datetime.timedelta(days=21)
+
+BORROWED = (
+    {"Success": "user has borrowed a copy of this book."},
+    status.HTTP_200_OK,
+)
+RESERVED = (
+    {"Success": "user has placed a reservation order on this book."},
+    status.HTTP_201_CREATED,
+)
+RETURNED = (
+    {"Success": "user returned the borrowed copy of the book."},
+    status.HTTP_200_OK,
+)
+ALREADY_BORROWED = (
+    {"Error": "user already borrowed a copy of this book."},
+    status.HTTP_400_BAD_REQUEST,
+)
+ALREADY_RESERVED = (
+    {"Error": "user has already placed a reservation on this book."},
+    status.HTTP_400_BAD_REQUEST,
+)
+NOT_BORROWED = (
+    {"Error": "user hasn't borrowed a copy of this book."},
+    status.HTTP_400_BAD_REQUEST,
+)
+UNKNOWN_BOOK = (
+    {"Error": "book does not exist."},
+    status.HTTP_404_NOT_FOUND,
+)
+UNKNOWN_USER = (
+    {"Error": "user does not exist."},
+    status.HTTP_404_NOT_FOUND,
+)
+
+
+def get_due_date():
+    return timezone.localdate() + LOAN_PERIOD
+
+
+def get_event(instance, action):
+    # the loan of the copy as it is when the event happens.
+    return LoanEvent(
+        book_id=instance.book_id,
+        copy_id=instance.pk,
+        borrower_id=instance.borrower_id,
+        action=action,
+        due_date=instance.due_date,
+    )
+
+
+def claim_copy(book, user):
+    # skip locked lets concurrent borrowers of the same title spread over
+    # the free copies instead of queueing on the first one. The NOT EXISTS
+    # guard turns "already borrowed" into a missed claim in the same query.
+    free_copy = (
+        BookInstance.available.filter(book=book)
+        .select_for_update(skip_locked=True)
+        .values("pk")[:1]
+    )
+    already_borrowed = BookInstance.objects.filter(book=book, borrower=user)
+    return (
+        BookInstance.objects.filter(pk=Subquery(free_copy), status="A")
+        .exclude(Exists(already_borrowed))
+        .update(borrower=user, due_date=get_due_date(), status="B")
+    )
+
+
+def borrow_book(book, user):
+    with transaction.atomic():
+        if claim_copy(book, user):
+            Book.objects.filter(pk=book.pk).update_copies(0, -1)
+            LoanEvent.objects.record_copies(
+                BookInstance.objects.filter(book=book, borrower=user), "B"
+            )
+            return BORROWED
+
+        if BookInstance.objects.filter(book=book, borrower=user).exists():
+            return ALREADY_BORROWED
+
+        if BookReservation.objects.filter(book=book, borrower=user).exists():
+            return ALREADY_RESERVED
+
+        BookReservation.objects.create(book=book, borrower=user)
+        return RESERVED
+
+
+def return_book(book, user):
+    with transaction.atomic():
+        instance = (
+            BookInstance.objects.select_for_update()
+            .filter(book=book, borrower=user)
+            .first()
+        )
+        if instance is None:
+            return NOT_BORROWED
+
+        events = [get_event(instance, "R")]
+        next_borrower = BookReservation.objects.pop_head(book)
+        if next_borrower is not None:
+            instance.borrower_id = next_borrower
+            instance.due_date = get_due_date()
+            events.append(get_event(instance, "H"))
+        else:
+            instance.borrower = None
+            instance.due_date = None
+            instance.status = "A"
+            Book.objects.filter(pk=book.pk).update_copies(0, 1)
+        instance.save(update_fields=["borrower", "due_date", "status"])
+        LoanEvent.objects.bulk_create(events)
+
+    return RETURNED
+
+
+def add_copies(book, copies_count):
+    # new copies serve the reservation queue first, so free copies only
+    # exist while nobody is waiting for the book.
+    with transaction.atomic():
+        instances = [BookInstance(book=book) for _ in range(copies_count)]
+        available_count = copies_count
+        for instance in instances:
+            next_borrower = BookReservation.objects.pop_head(book)
+            if next_borrower is None:
+                break
+            instance.borrower_id = next_borrower
+            instance.due_date = get_due_date()
+            instance.status = "B"
+            available_count -= 1
+
+        BookInstance.objects.bulk_create(instances)
+        Book.objects.filter(pk=book.pk).update_copies(copies_count, available_count)
+        LoanEvent.objects.bulk_create(
+            get_event(instance, "H") for instance in instances if instance.borrower_id
+        )
+    return instances
+
+
+class BatchCirculation:
+    # Applies a cart of borrow/return operations with the rules of
+    # borrow_book and return_book. All state the batch can touch is loaded
+    # up front with one query per kind (free copies and queue heads with one
+    # query per distinct book), operations are resolved in memory in request
+    # order, and the changes are written back with bulk statements.
+
+    def __init__(self, operations):
+        self.operations = operations
+        self.book_pks = {operation["book"] for operation in operations}
+        self.user_pks = {operation["user"] for operation in operations}
+
+    def apply(self):
+        with transaction.atomic():
+            self.load()
+            results = [self.apply_operation(operation) for operation in self.operations]
+            self.save()
+        return results
+
+    def load(self):
+        self.book_pks &= set(
+            Book.objects.filter(pk__in=self.book_pks).values_list("pk", flat=True)
+        )
+        self.user_pks &= set(
+            user_model.objects.filter(pk__in=self.user_pks).values_list("pk", flat=True)
+        )
+
+        self.loans = {
+            (instance.book_id, instance.borrower_id): instance
+            for instance in BookInstance.objects.select_for_update().filter(
+                book__in=self.book_pks, borrower__in=self.user_pks
+            )
+        }
+        self.reserved = set(
+            BookReservation.objects.filter(
+                book__in=self.book_pks, borrower__in=self.user_pks
+            ).values_list("book", "borrower")
+        )
+
+        borrows = defaultdict(int)
+        returns = defaultdict(int)
+        for operation in self.operations:
+            if operation["action"] == "borrow":
+                borrows[operation["book"]] += 1
+            else:
+                returns[operation["book"]] += 1
+
+        self.free_copies = defaultdict(deque)
+        for book_pk, count in borrows.items():
+            if book_pk not in self.book_pks:
+                continue
+            self.free_copies[book_pk].extend(
+                BookInstance.available.filter(book=book_pk)
+                .select_for_update(skip_locked=True)
+                .order_by("pk")[:count]
+            )
+
+        # the queue only needs as many heads as there are returns to serve.
+        self.queues = defaultdict(deque)
+        for book_pk, count in returns.items():
+            if book_pk not in self.book_pks:
+                continue
+            self.queues[book_pk].extend(
+                BookReservation.objects.filter(book=book_pk)
+                .select_for_update(skip_locked=True)
+                .order_by("created", "id")[:count]
+            )
+
+        self.changed_copies = {}
+        self.events = []
+        self.served_reservations = []
+        self.new_reservations = []
+        self.available_deltas = defaultdict(int)
+
+    def apply_operation(self, operation):
+        book_pk, user_pk = operation["book"], operation["user"]
+        if book_pk not in self.book_pks:
+            result = UNKNOWN_BOOK
+        elif user_pk not in self.user_pks:
+            result = UNKNOWN_USER
+        elif operation["action"] == "borrow":
+            result = self.borrow(book_pk, user_pk)
+        else:
+            result = self.return_(book_pk, user_pk)
+
+        body, status_code = result
+        return {**operation, **body, "status": status_code}
+
+    def borrow(self, book_pk, user_pk):
+        if (book_pk, user_pk) in self.loans:
+            return ALREADY_BORROWED
+
+        free_copies = self.free_copies[book_pk]
+        if free_copies:
+            instance = free_copies.popleft()
+            instance.borrower_id = user_pk
+            instance.due_date = get_due_date()
+            instance.status = "B"
+            self.loans[(book_pk, user_pk)] = instance
+            self.events.append(get_event(instance, "B"))
+            self.changed_copies[instance.pk] = instance
+            self.available_deltas[book_pk] -= 1
+            return BORROWED
+
+        if (book_pk, user_pk) in self.reserved:
+            return ALREADY_RESERVED
+
+        reservation = BookReservation(book_id=book_pk, borrower_id=user_pk)
+        self.reserved.add((book_pk, user_pk))
+        self.new_reservations.append(reservation)
+        self.queues[book_pk].append(reservation)
+        return RESERVED
+
+    def return_(self, book_pk, user_pk):
+        instance = self.loans.pop((book_pk, user_pk), None)
+        if instance is None:
+            return NOT_BORROWED
+
+        self.events.append(get_event(instance, "R"))
+        queue = self.queues[book_pk]
+        if queue:
+            reservation = queue.popleft()
+            if reservation.pk is None:
+                self.new_reservations.remove(reservation)
+            else:
+                self.served_reservations.append(reservation.pk)
+            self.reserved.discard((book_pk, reservation.borrower_id))
+
+            instance.borrower_id = reservation.borrower_id
+            instance.due_date = get_due_date()
+            self.loans[(book_pk, reservation.borrower_id)] = instance
+            self.events.append(get_event(instance, "H"))
+        else:
+            instance.borrower_id = None
+            instance.due_date = None
+            instance.status = "A"
+            self.free_copies[book_pk].append(instance)
+            self.available_deltas[book_pk] += 1
+        self.changed_copies[instance.pk] = instance
+        return RETURNED
+
+    def save(self):
+        if self.served_reservations:
+            BookReservation.objects.filter(pk__in=self.served_reservations).delete()
+        if self.new_reservations:
+            BookReservation.objects.bulk_create(self.new_reservations)
+        if self.changed_copies:
+            BookInstance.objects.bulk_update(
+                self.changed_copies.values(), ["borrower", "due_date", "status"]
+            )
+        if self.events:
+            LoanEvent.objects.bulk_create(self.events)
+
+        books = []
+        for book_pk, delta in self.available_deltas.items():
+            if delta:
+                book = Book(pk=book_pk)
+                book.copies_available = F("copies_available") + delta
+                book.updated_at = timezone.now()
+                books.append(book)
+        if books:
+            Book.objects.bulk_update(books, ["copies_available", "updated_at"])
+
+
+def apply_operations(operations):
+    return BatchCirculation(operations).apply()
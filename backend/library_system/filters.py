@@ -1,8 +1,16 @@
 import django_filters
 
-from django.contrib.postgres.search import SearchVector
+from django.db import connections
+from django.db.models import F, Q, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce, Greatest
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
 
-from library_system.models import Book
+from library_system.models import Author, Book
+from core.settings import LIBRARY_SEARCH_SETTINGS
 
 
 class BookFilter(django_filters.FilterSet):
@@ -16,18 +24,82 @@ class BookFilter(django_filters.FilterSet):
             "publish_date": ["lte", "gte"],
         }
 
-    SEARCH_VECTOR = SearchVector(
-        "title",
-        "isbn",
-        "summary",
-        "authors__first_name",
-        "authors__last_name",
-        "categories__name",
-        "publication__name",
+    available = django_filters.BooleanFilter(
+        label="Available", method="filter_available"
     )
-
     search = django_filters.CharFilter(label="Search", method="filter_search")
+    fuzzy_search = django_filters.CharFilter(
+        label="Fuzzy search", method="filter_fuzzy_search"
+    )
+
+    def filter_available(self, queryset, name, value):
+        if value:
+            return queryset.filter(copies_available__gt=0)
+        return queryset.filter(copies_available=0)
 
     def filter_search(self, queryset, name, value):
-        queryset = queryset.annotate(search=self.SEARCH_VECTOR)
-        return queryset.filter(search=value)
+        query = SearchQuery(value, search_type="websearch")
+        queryset = queryset.filter(search_vector=query)
+        # ranks are computed as real, cast them so cursor positions compare exactly.
+        queryset = queryset.annotate(
+            search_rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+        return queryset.order_by("-search_rank", "pk")
+
+    def filter_fuzzy_search(self, queryset, name, value):
+        # the %> operator compares against this threshold, which keeps the
+        # match inside the trigram indexes instead of filtering on the score.
+        # BookViewSet reads fuzzy searches in a transaction, the setting is
+        # local to it so it also holds behind a transaction pooler, where a
+        # session setting may land on another server connection.
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, %s)",
+                [
+                    str(LIBRARY_SEARCH_SETTINGS["trigram_threshold"]),
+                    connection.in_atomic_block,
+                ],
+            )
+
+        # each branch is answered by its own trigram index, the union keeps
+        # the candidate set small before ranking.
+        matching_titles = Book.objects.filter(title__trigram_word_similar=value)
+        matching_authors = Book.authors.through.objects.filter(
+            Q(author__first_name__trigram_word_similar=value)
+            | Q(author__last_name__trigram_word_similar=value)
+        )
+        matching_publications = Book.objects.filter(
+            publication__name__trigram_word_similar=value
+        )
+        queryset = queryset.filter(
+            pk__in=matching_titles.values("pk").union(
+                matching_authors.values("book"),
+                matching_publications.values("pk"),
+            )
+        )
+
+        authors = Author.objects.filter(books=OuterRef("pk"))
+        authors_similarity = (
+            authors.annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(value, "first_name"),
+                    TrigramWordSimilarity(value, "last_name"),
+                )
+            )
+            .order_by("-similarity")
+            .values("similarity")[:1]
+        )
+        similarity = Greatest(
+            TrigramWordSimilarity(value, "title"),
+            Coalesce(Subquery(authors_similarity), 0.0),
+            TrigramWordSimilarity(value, "publication__name"),
+        )
+        query = SearchQuery(value, search_type="websearch")
+        queryset = queryset.annotate(
+            search_rank=Cast(
+                similarity + Coalesce(SearchRank(F("search_vector"), query), 0.0),
+                FloatField(),
+            )
+        )
+        return queryset.order_by("-search_rank", "pk")
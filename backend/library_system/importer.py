@@ -0,0 +1,308 @@
+import csv
+import datetime
+import json
+import itertools
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.core.exceptions import ValidationError
+
+from core.caching import bump_version
+
+from library_system.models import (
+    Author,
+    Category,
+    Publication,
+    Book,
+    BookInstance,
+)
+
+
+IMPORT_FORMATS = ("csv", "ndjson")
+LIST_SEPARATOR = ";"
+MAX_REPORTED_ERRORS = 100
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        for key in ("authors", "categories"):
+            row[key] = [
+                value.strip()
+                for value in (row.get(key) or "").split(LIST_SEPARATOR)
+                if value.strip()
+            ]
+        yield row
+
+
+def read_ndjson(stream):
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # rejected with its line number by CatalogImporter.clean_record.
+            yield None
+
+
+def run_field_validators(model, **values):
+    # bulk_create skips full_clean, so the field validators of the models
+    # (name_validator, max lengths, positive counts) are run here instead.
+    errors = {}
+    for name, value in values.items():
+        try:
+            model._meta.get_field(name).run_validators(value)
+        except ValidationError as error:
+            errors[name] = error.messages
+    if errors:
+        raise ValidationError(errors)
+
+
+def split_full_name(full_name):
+    first_name, _, last_name = full_name.strip().rpartition(" ")
+    return first_name.strip() or last_name, last_name
+
+
+class CatalogImporter:
+    # Streams records from a CSV/NDJSON file and loads them chunk by chunk,
+    # each chunk in its own transaction. Authors, categories and publications
+    # are matched case-insensitively against their unique constraints and the
+    # missing ones are created in bulk, books, their relations and copies are
+    # all written with bulk_create, so memory stays bounded by the chunk size.
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.stats = {
+            "books_created": 0,
+            "books_skipped": 0,
+            "books_rejected": 0,
+            "copies_created": 0,
+            "authors_created": 0,
+            "categories_created": 0,
+            "publications_created": 0,
+            "errors": [],
+        }
+
+    def import_stream(self, stream, file_format):
+        reader = read_csv(stream) if file_format == "csv" else read_ndjson(stream)
+
+        records = enumerate(reader, start=1)
+        while True:
+            chunk = list(itertools.islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        return self.stats
+
+    def import_chunk(self, chunk):
+        records = {}
+        for line, record in chunk:
+            try:
+                record = self.clean_record(record)
+            except (
+                ValidationError,
+                AttributeError,
+                KeyError,
+                TypeError,
+                ValueError,
+            ) as error:
+                self.add_error(line, error)
+                continue
+            if record["isbn"] in records:
+                self.stats["books_skipped"] += 1
+                continue
+            records[record["isbn"]] = record
+
+        existing = set(
+            Book.objects.filter(isbn__in=records.keys()).values_list("isbn", flat=True)
+        )
+        self.stats["books_skipped"] += len(existing)
+        records = [record for isbn, record in records.items() if isbn not in existing]
+        if not records:
+            return
+
+        with transaction.atomic():
+            publications = self.resolve_named(
+                Publication,
+                {record["publication"] for record in records},
+                "publications_created",
+            )
+            categories = self.resolve_named(
+                Category,
+                {name for record in records for name in record["categories"]},
+                "categories_created",
+            )
+            authors = self.resolve_authors(
+                {name for record in records for name in record["authors"]}
+            )
+
+            books = Book.objects.bulk_create(
+                [
+                    Book(
+                        isbn=record["isbn"],
+                        title=record["title"],
+                        summary=record["summary"],
+                        pages=record["pages"],
+                        edition=record["edition"],
+                        publish_date=record["publish_date"],
+                        language=record["language"],
+                        publication=publications[record["publication"].lower()],
+                        copies_total=record["copies"],
+                        copies_available=record["copies"],
+                    )
+                    for record in records
+                ]
+            )
+
+            book_authors = []
+            book_categories = []
+            copies = []
+            for book, record in zip(books, records):
+                for name in record["authors"]:
+                    author = authors[split_full_name(name.lower())]
+                    book_authors.append(
+                        Book.authors.through(book_id=book.pk, author_id=author.pk)
+                    )
+                for name in record["categories"]:
+                    category = categories[name.lower()]
+                    book_categories.append(
+                        Book.categories.through(
+                            book_id=book.pk, category_id=category.pk
+                        )
+                    )
+                copies.extend(BookInstance(book=book) for _ in range(record["copies"]))
+
+            Book.authors.through.objects.bulk_create(
+                book_authors, ignore_conflicts=True
+            )
+            Book.categories.through.objects.bulk_create(
+                book_categories, ignore_conflicts=True
+            )
+            BookInstance.objects.bulk_create(copies, batch_size=self.chunk_size)
+            Book.objects.filter(
+                pk__in=[book.pk for book in books]
+            ).refresh_search_vector()
+
+        self.stats["books_created"] += len(books)
+        self.stats["copies_created"] += len(copies)
+
+    def clean_record(self, record):
+        if not isinstance(record, dict):
+            raise ValidationError("record is not an object.")
+
+        isbn = str(record["isbn"]).strip()
+        if len(isbn) != 13:
+            raise ValidationError("ISBN must be a string of digits of length 13.")
+
+        title = str(record["title"]).strip()
+        publication = str(record["publication"]).strip()
+        if not title or not publication:
+            raise ValidationError("title and publication are required.")
+
+        # empty names would create blank authors and categories.
+        authors = [str(name).strip() for name in record.get("authors") or []]
+        authors = [name for name in authors if name]
+        categories = [str(name).strip() for name in record.get("categories") or []]
+        categories = [name for name in categories if name]
+
+        language = record.get("language") or "en"
+        if language not in dict(Book.LANGUAGE_CHOICES):
+            raise ValidationError(f"unknown language {language}.")
+
+        copies = int(record.get("copies") or 0)
+        if copies < 0:
+            raise ValidationError("copies count must be non negative.")
+
+        pages = record.get("pages")
+        pages = None if pages in (None, "") else int(pages)
+        edition = record.get("edition")
+        edition = None if edition in (None, "") else int(edition)
+
+        publish_date = record.get("publish_date") or None
+        if publish_date is not None:
+            publish_date = datetime.date.fromisoformat(publish_date)
+
+        run_field_validators(Book, isbn=isbn, title=title, pages=pages, edition=edition)
+        run_field_validators(Publication, name=publication)
+        for name in categories:
+            run_field_validators(Category, name=name)
+        for first_name, last_name in map(split_full_name, authors):
+            run_field_validators(Author, first_name=first_name, last_name=last_name)
+
+        return {
+            "isbn": isbn,
+            "title": title,
+            "summary": record.get("summary") or "",
+            "pages": pages,
+            "edition": edition,
+            "publish_date": publish_date,
+            "language": language,
+            "publication": publication,
+            "authors": authors,
+            "categories": categories,
+            "copies": copies,
+        }
+
+    def add_error(self, line, error):
+        self.stats["books_rejected"] += 1
+        if len(self.stats["errors"]) < MAX_REPORTED_ERRORS:
+            message = (
+                error.messages if isinstance(error, ValidationError) else str(error)
+            )
+            self.stats["errors"].append({"line": line, "error": message})
+
+    def resolve_named(self, model, names, counter):
+        names = {name.lower(): name for name in names}
+        resolved = self.fetch_named(model, names.keys())
+
+        missing = [
+            model(name=name)
+            for lowered, name in names.items()
+            if lowered not in resolved
+        ]
+        if missing:
+            # SlugManager.bulk_create writes the final slugs with the rows.
+            found_count = len(resolved)
+            model.objects.bulk_create(missing, ignore_conflicts=True)
+            resolved = self.fetch_named(model, names.keys())
+            self.stats[counter] += len(resolved) - found_count
+            transaction.on_commit(lambda: bump_version(model))
+        return resolved
+
+    def fetch_named(self, model, lowered_names):
+        return {
+            instance.lowered_name: instance
+            for instance in model.objects.annotate(lowered_name=Lower("name")).filter(
+                lowered_name__in=lowered_names
+            )
+        }
+
+    def resolve_authors(self, full_names):
+        names = {split_full_name(name.lower()): name for name in full_names}
+        resolved = self.fetch_authors(names.keys())
+
+        missing = [
+            Author(first_name=first_name, last_name=last_name)
+            for first_name, last_name in map(split_full_name, names.values())
+            if (first_name.lower(), last_name.lower()) not in resolved
+        ]
+        if missing:
+            found_count = len(resolved)
+            Author.objects.bulk_create(missing, ignore_conflicts=True)
+            resolved = self.fetch_authors(names.keys())
+            self.stats["authors_created"] += len(resolved) - found_count
+            transaction.on_commit(lambda: bump_version(Author))
+        return resolved
+
+    def fetch_authors(self, lowered_names):
+        authors = Author.objects.annotate(
+            lowered_first_name=Lower("first_name"),
+            lowered_last_name=Lower("last_name"),
+        ).filter(
+            lowered_first_name__in={first_name for first_name, _ in lowered_names},
+            lowered_last_name__in={last_name for _, last_name in lowered_names},
+        )
+        return {
+            (author.lowered_first_name, author.lowered_last_name): author
+            for author in authors
+        }
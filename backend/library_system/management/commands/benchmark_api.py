@@ -0,0 +1,98 @@
+import json
+
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from knox.models import AuthToken
+
+from library_system.benchmarks import (
+    BENCHMARK_TARGETS,
+    ApiBenchmark,
+    LocalClient,
+    ServerClient,
+    compare,
+    get_environment,
+    load_results,
+)
+
+
+user_model = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Measure latency percentiles, queries and allocations of the main API paths and write them as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=BENCHMARK_TARGETS,
+            default="sync",
+            help="Read the catalog through the sync viewsets or the /api/async/ views.",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Send the requests to a running server instead of the test client.",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--profile-requests",
+            type=int,
+            default=20,
+            help="Extra requests per scenario measured for queries and allocations.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            help="Only run the given scenario, may be repeated.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", type=Path, help="File to write the JSON to.")
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            help="Earlier results to report the relative changes against.",
+        )
+
+    def handle(self, *args, **options):
+        user, _ = user_model.objects.get_or_create(
+            username="benchmark",
+            defaults={"email": "benchmark@example.com", "is_staff": True},
+        )
+        instance, token = AuthToken.objects.create(user)
+        try:
+            if options["base_url"]:
+                client = ServerClient(token, options["base_url"])
+            else:
+                client = LocalClient(token)
+            benchmark = ApiBenchmark(
+                client,
+                target=options["target"],
+                requests=options["requests"],
+                profile_requests=options["profile_requests"],
+            )
+            try:
+                results = benchmark.run(options["scenario"], seed=options["seed"])
+            except ValueError as error:
+                raise CommandError(str(error))
+        finally:
+            instance.delete()
+
+        report = {
+            "environment": get_environment(
+                options["target"],
+                options["base_url"],
+                options["requests"],
+                options["seed"],
+            ),
+            "results": results,
+        }
+        if options["compare"]:
+            report["changes"] = compare(load_results(options["compare"]), report)
+
+        content = json.dumps(report, indent=2)
+        if options["output"]:
+            options["output"].write_text(content + "\n", encoding="utf-8")
+        else:
+            self.stdout.write(content)
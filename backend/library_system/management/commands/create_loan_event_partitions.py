@@ -0,0 +1,42 @@
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from library_system.partitions import add_months, create_partitions, drop_partitions
+
+
+class Command(BaseCommand):
+    help = "Create the monthly partitions of the loan history ahead of time and drop the expired ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of months after the current one to create partitions for.",
+        )
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=None,
+            help="Drop the partitions that ended more than this many months ago, all are kept by default.",
+        )
+
+    def handle(self, *args, **options):
+        this_month = timezone.localdate().replace(day=1)
+        created = create_partitions(
+            this_month, add_months(this_month, options["months_ahead"])
+        )
+        for name in created:
+            self.stdout.write(f"Created {name}.")
+
+        dropped = []
+        if options["keep_months"] is not None:
+            dropped = drop_partitions(add_months(this_month, -options["keep_months"]))
+        for name in dropped:
+            self.stdout.write(f"Dropped {name}.")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(created)} and dropped {len(dropped)} loan history partitions."
+            )
+        )
@@ -0,0 +1,43 @@
+import time
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library_system.importer import IMPORT_FORMATS, CatalogImporter
+
+
+class Command(BaseCommand):
+    help = "Import books, authors, categories, publications and copies from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="File format, guessed from the file extension by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of records written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Unknown import format {file_format}.")
+
+        start = time.monotonic()
+        importer = CatalogImporter(chunk_size=options["chunk_size"])
+        with path.open(encoding="utf-8", newline="") as stream:
+            stats = importer.import_stream(stream, file_format)
+        elapsed = time.monotonic() - start
+
+        for error in stats.pop("errors"):
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        for name, value in stats.items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS(f"Import finished in {elapsed:.1f}s."))
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from library_system.models import Book
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored full-text search document of every book."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of books reindexed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        updated = 0
+        while True:
+            pks = list(
+                Book.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+
+            with transaction.atomic():
+                updated += Book.objects.filter(pk__in=pks).refresh_search_vector()
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {updated} books."))
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from library_system.models import Book
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored review and copy counters of every book."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of books updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        updated = 0
+        while True:
+            pks = list(
+                Book.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+
+            with transaction.atomic():
+                books = Book.objects.filter(pk__in=pks)
+                books.recompute_copies()
+                updated += books.recompute_ratings()
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed stats of {updated} books."))
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library_system.seeding import SEED_WRITERS, CatalogSeeder, get_writer
+
+
+class Command(BaseCommand):
+    help = "Fill the database with a reproducible synthetic catalog, readers, loans, reservations, reviews, reset tokens and queued emails."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--authors", type=int, default=200)
+        parser.add_argument("--categories", type=int, default=12)
+        parser.add_argument("--publications", type=int, default=50)
+        parser.add_argument("--books", type=int, default=1000)
+        parser.add_argument("--copies-per-book", type=int, default=3)
+        parser.add_argument("--reviews-per-book", type=int, default=2)
+        parser.add_argument(
+            "--reservations-per-book",
+            type=int,
+            default=2,
+            help="Queue length of the books that have no free copy.",
+        )
+        parser.add_argument(
+            "--loan-ratio",
+            type=float,
+            default=0.3,
+            help="Share of the copies of each book that are borrowed.",
+        )
+        parser.add_argument("--reset-tokens", type=int, default=20)
+        parser.add_argument("--emails", type=int, default=50)
+        parser.add_argument(
+            "--writer",
+            choices=SEED_WRITERS,
+            default="auto",
+            help="COPY on PostgreSQL and bulk_create elsewhere by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of books written per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        seeder = CatalogSeeder(
+            seed=options["seed"],
+            users=options["users"],
+            authors=options["authors"],
+            categories=options["categories"],
+            publications=options["publications"],
+            books=options["books"],
+            copies_per_book=options["copies_per_book"],
+            reviews_per_book=options["reviews_per_book"],
+            reservations_per_book=options["reservations_per_book"],
+            loan_ratio=options["loan_ratio"],
+            reset_tokens=options["reset_tokens"],
+            emails=options["emails"],
+            chunk_size=options["chunk_size"],
+            writer=get_writer(options["writer"], options["chunk_size"]),
+        )
+        stats = seeder.seed()
+        elapsed = time.monotonic() - start
+
+        for name, value in stats.items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS(f"Seeding finished in {elapsed:.1f}s."))
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_aggregates(apps, schema_editor):
+    Book = apps.get_model("library_system", "Book")
+    Review = apps.get_model("library_system", "Review")
+
+    reviews = Review.objects.filter(book=models.OuterRef("pk")).values("book")
+    Book.objects.update(
+        reviews_count=Coalesce(
+            models.Subquery(reviews.annotate(value=models.Count("id")).values("value")),
+            0,
+        ),
+        reviews_stars_sum=Coalesce(
+            models.Subquery(reviews.annotate(value=models.Sum("stars")).values("value")),
+            0,
+        ),
+        reviews_star_average=Coalesce(
+            models.Subquery(
+                reviews.annotate(
+                    value=models.Avg("stars", output_field=models.FloatField())
+                ).values("value")
+            ),
+            0.0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_system', '0003_bookreservation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='reviews_star_average',
+            field=models.FloatField(default=0, editable=False, help_text='Average review stars, maintained on every review change.'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='reviews_stars_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['reviews_star_average'], name='book_star_average_index'),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
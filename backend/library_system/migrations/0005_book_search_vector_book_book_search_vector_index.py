@@ -0,0 +1,65 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.functions import Concat
+
+
+def backfill_search_vector(apps, schema_editor):
+    Author = apps.get_model("library_system", "Author")
+    Category = apps.get_model("library_system", "Category")
+    Publication = apps.get_model("library_system", "Publication")
+    Book = apps.get_model("library_system", "Book")
+
+    authors = (
+        Author.objects.filter(books=models.OuterRef("pk"))
+        .values("books")
+        .annotate(
+            names=StringAgg(
+                Concat("first_name", models.Value(" "), "last_name"), delimiter=" "
+            )
+        )
+        .values("names")
+    )
+    categories = (
+        Category.objects.filter(books=models.OuterRef("pk"))
+        .values("books")
+        .annotate(names=StringAgg("name", delimiter=" "))
+        .values("names")
+    )
+    publication = Publication.objects.filter(pk=models.OuterRef("publication")).values(
+        "name"
+    )
+    Book.objects.update(
+        search_vector=(
+            SearchVector("title", "isbn", weight="A")
+            + SearchVector(models.Subquery(authors), weight="B")
+            + SearchVector(
+                models.Subquery(categories), models.Subquery(publication), weight="C"
+            )
+            + SearchVector("summary", weight="D")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_system', '0004_book_reviews_count_book_reviews_star_average_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Weighted full-text document of the book, see refresh_search_vector.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='book_search_vector_index'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:21
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_system', '0005_book_search_vector_book_book_search_vector_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='author',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['first_name'], name='author_first_name_trgm_index', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['last_name'], name='author_last_name_trgm_index', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='book_title_trgm_index', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='publication_name_trgm_index', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_system', '0006_author_author_first_name_trgm_index_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_star_average_index',
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['pages', 'id'], name='book_pages_id_index'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publish_date', 'id'], name='book_publish_date_id_index'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['reviews_star_average', 'id'], name='book_star_average_id_index'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:24
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_copy_counters(apps, schema_editor):
+    Book = apps.get_model("library_system", "Book")
+    BookInstance = apps.get_model("library_system", "BookInstance")
+
+    copies = BookInstance.objects.filter(book=models.OuterRef("pk")).values("book")
+    Book.objects.update(
+        copies_total=Coalesce(
+            models.Subquery(copies.annotate(value=models.Count("id")).values("value")),
+            0,
+        ),
+        copies_available=Coalesce(
+            models.Subquery(
+                copies.filter(status="A")
+                .annotate(value=models.Count("id"))
+                .values("value")
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library_system', '0007_remove_book_book_star_average_index_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Copies currently on the shelf, maintained on every circulation change.'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['copies_available', 'id'], name='book_copies_available_id_index'),
+        ),
+        migrations.RunPython(backfill_copy_counters, migrations.RunPython.noop),
+    ]
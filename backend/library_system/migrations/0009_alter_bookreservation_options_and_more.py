@@ -0,0 +1,59 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def remove_duplicate_reservations(apps, schema_editor):
+    # keeps the oldest reservation of a borrower on each book, so the unique
+    # constraint below can be added to a queue that already has duplicates.
+    BookReservation = apps.get_model("library_system", "BookReservation")
+    older = BookReservation.objects.filter(
+        book=models.OuterRef("book"),
+        borrower=models.OuterRef("borrower"),
+        id__lt=models.OuterRef("id"),
+    )
+    BookReservation.objects.filter(models.Exists(older)).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library_system", "0008_book_copies_available_book_copies_total_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="bookreservation",
+            options={"ordering": ["created", "id"]},
+        ),
+        migrations.RemoveIndex(
+            model_name="bookreservation",
+            name="b-reservation_id_book",
+        ),
+        migrations.AddField(
+            model_name="bookreservation",
+            name="created",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="Time the reservation joined the queue of the book.",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookreservation",
+            index=models.Index(
+                fields=["book", "created", "id"], name="b-reservation_queue_index"
+            ),
+        ),
+        migrations.RunPython(
+            remove_duplicate_reservations, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="bookreservation",
+            constraint=models.UniqueConstraint(
+                models.F("book"),
+                models.F("borrower"),
+                name="b-reservation_unique_book_borrower",
+            ),
+        ),
+    ]
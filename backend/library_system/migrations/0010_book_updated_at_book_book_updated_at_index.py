@@ -0,0 +1,24 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library_system", "0009_alter_bookreservation_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="Last change to the book's representation, including its counters.",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["updated_at"], name="book_updated_at_index"),
+        ),
+    ]
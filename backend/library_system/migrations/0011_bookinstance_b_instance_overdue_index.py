@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("library_system", "0010_book_updated_at_book_book_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bookinstance",
+            index=models.Index(
+                condition=models.Q(("status", "B")),
+                fields=["due_date"],
+                name="b-instance_overdue_index",
+            ),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("library_system", "0011_bookinstance_b_instance_overdue_index"),
+    ]
+
+    operations = [
+        # Django can't declare a composite primary key or a partitioned table,
+        # the state keeps `id` as the primary key and the table is created by
+        # hand. The primary key of a partitioned table has to include the
+        # partition key. Rows outside of the monthly partitions made by the
+        # create_loan_event_partitions command land in the default partition.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="LoanEvent",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "action",
+                            models.CharField(
+                                choices=[
+                                    ("B", "Borrowed"),
+                                    ("R", "Returned"),
+                                    ("H", "Handed off"),
+                                ],
+                                max_length=1,
+                            ),
+                        ),
+                        (
+                            "due_date",
+                            models.DateField(
+                                blank=True,
+                                help_text="Due date of the loan the event belongs to.",
+                                null=True,
+                            ),
+                        ),
+                        (
+                            "created",
+                            models.DateTimeField(
+                                default=django.utils.timezone.now, editable=False
+                            ),
+                        ),
+                        (
+                            "book",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                db_index=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to="library_system.book",
+                            ),
+                        ),
+                        (
+                            "borrower",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                db_index=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                        (
+                            "copy",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                db_index=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to="library_system.bookinstance",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "loan_event",
+                        "indexes": [
+                            models.Index(
+                                fields=["created"], name="loan_event_created_index"
+                            ),
+                            models.Index(
+                                fields=["book", "created"],
+                                name="loan_event_book_created_index",
+                            ),
+                        ],
+                    },
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql="""
+                    CREATE TABLE loan_event (
+                        id bigint GENERATED BY DEFAULT AS IDENTITY,
+                        book_id bigint NOT NULL,
+                        copy_id bigint NOT NULL,
+                        borrower_id varchar(150) NOT NULL,
+                        action varchar(1) NOT NULL,
+                        due_date date NULL,
+                        created timestamp with time zone NOT NULL,
+                        PRIMARY KEY (id, created)
+                    ) PARTITION BY RANGE (created);
+                    CREATE TABLE loan_event_default PARTITION OF loan_event DEFAULT;
+                    CREATE INDEX loan_event_created_index ON loan_event (created);
+                    CREATE INDEX loan_event_book_created_index
+                        ON loan_event (book_id, created);
+                    """,
+                    reverse_sql="DROP TABLE loan_event",
+                ),
+            ],
+        ),
+    ]
@@ -1,7 +1,11 @@
-import datetime
-
-from django.db import models
-from django.db.models.functions import Lower
+import uuid
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.db.models.functions import Cast, Coalesce, Concat, Lower, NullIf, TruncDate
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.template.defaultfilters import slugify
 from django.contrib.auth import get_user_model
 
@@ -27,17 +31,56 @@ def get_order(value: int):
         return f"{value}th."
 
 
+def reserve_ids(model, count):
+    # takes ids from the primary key sequence ahead of the insert so rows can
+    # be written once with their final slug, returns None when unsupported.
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def assign_slugs(model, instances):
+    pending = [instance for instance in instances if not instance.slug]
+    without_id = [instance for instance in pending if instance.pk is None]
+    ids = reserve_ids(model, len(without_id)) if without_id else []
+    if ids is None:
+        # without a sequence to draw from, a random key keeps slugs unique.
+        for instance in pending:
+            instance.slug = instance.create_slug(instance.pk or uuid.uuid4().hex[:12])
+        return
+
+    for instance, pk in zip(without_id, ids):
+        instance.pk = pk
+    for instance in pending:
+        instance.slug = instance.create_slug(instance.pk)
+
+
+class SlugManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        assign_slugs(self.model, objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class SlugMixin:
-    def create_slug(self):
+    def create_slug(self, key):
         raise NotImplementedError(
             {f"Class {type(self).__name__}": "create_slug not implemented."}
         )
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
         if not self.slug:
-            self.slug = self.create_slug()
-            self.save()
+            has_id = self.pk is not None
+            assign_slugs(type(self), [self])
+            if not has_id and self.pk is not None:
+                kwargs["force_insert"] = True
+        super().save(*args, **kwargs)
 
 
 class Author(SlugMixin, models.Model):
@@ -55,8 +98,20 @@ class Author(SlugMixin, models.Model):
                 fields=["first_name", "last_name"],
                 name="author_full_name_index",
             ),
+            GinIndex(
+                fields=["first_name"],
+                opclasses=["gin_trgm_ops"],
+                name="author_first_name_trgm_index",
+            ),
+            GinIndex(
+                fields=["last_name"],
+                opclasses=["gin_trgm_ops"],
+                name="author_last_name_trgm_index",
+            ),
         ]
 
+    objects = SlugManager()
+
     first_name = models.CharField(
         max_length=40,
         validators=[name_validator],
@@ -73,8 +128,8 @@ class Author(SlugMixin, models.Model):
         null=False,
     )
 
-    def create_slug(self):
-        text = f"{self.first_name} {self.last_name}_{self.id}"
+    def create_slug(self, key):
+        text = f"{self.first_name} {self.last_name}_{key}"
         return slugify(text)
 
     @property
@@ -104,6 +159,8 @@ class Category(SlugMixin, models.Model):
             ),
         ]
 
+    objects = SlugManager()
+
     name = models.CharField(
         max_length=40,
         validators=[name_validator],
@@ -115,8 +172,8 @@ class Category(SlugMixin, models.Model):
         null=False,
     )
 
-    def create_slug(self):
-        text = f"{self.name}_{self.id}"
+    def create_slug(self, key):
+        text = f"{self.name}_{key}"
         return slugify(text)
 
     def __str__(self):
@@ -137,8 +194,15 @@ class Publication(SlugMixin, models.Model):
                 fields=["name"],
                 name="publication_name_index",
             ),
+            GinIndex(
+                fields=["name"],
+                opclasses=["gin_trgm_ops"],
+                name="publication_name_trgm_index",
+            ),
         ]
 
+    objects = SlugManager()
+
     name = models.CharField(
         max_length=40,
     )
@@ -149,14 +213,108 @@ class Publication(SlugMixin, models.Model):
         null=False,
     )
 
-    def create_slug(self):
-        text = f"{self.name}_{self.id}"
+    def create_slug(self, key):
+        text = f"{self.name}_{key}"
         return slugify(text)
 
     def __str__(self):
         return self.name
 
 
+class BookQuerySet(models.QuerySet):
+    def update_rating(self, count_delta: int, stars_delta: int):
+        reviews_count = models.F("reviews_count") + count_delta
+        reviews_stars_sum = models.F("reviews_stars_sum") + stars_delta
+        return self.update(
+            reviews_count=reviews_count,
+            reviews_stars_sum=reviews_stars_sum,
+            reviews_star_average=Coalesce(
+                Cast(reviews_stars_sum, models.FloatField()) / NullIf(reviews_count, 0),
+                0.0,
+            ),
+            updated_at=timezone.now(),
+        )
+
+    def update_copies(self, total_delta: int, available_delta: int):
+        return self.update(
+            copies_total=models.F("copies_total") + total_delta,
+            copies_available=models.F("copies_available") + available_delta,
+            updated_at=timezone.now(),
+        )
+
+    def recompute_copies(self):
+        copies = BookInstance.objects.filter(book=models.OuterRef("pk")).values("book")
+        copies_total = models.Subquery(
+            copies.annotate(value=models.Count("id")).values("value")
+        )
+        copies_available = models.Subquery(
+            copies.filter(status="A").annotate(value=models.Count("id")).values("value")
+        )
+        return self.update(
+            copies_total=Coalesce(copies_total, 0),
+            copies_available=Coalesce(copies_available, 0),
+            updated_at=timezone.now(),
+        )
+
+    def recompute_ratings(self):
+        reviews = Review.objects.filter(book=models.OuterRef("pk")).values("book")
+        reviews_count = models.Subquery(
+            reviews.annotate(value=models.Count("id")).values("value")
+        )
+        reviews_stars_sum = models.Subquery(
+            reviews.annotate(value=models.Sum("stars")).values("value")
+        )
+        reviews_star_average = models.Subquery(
+            reviews.annotate(
+                value=models.Avg("stars", output_field=models.FloatField())
+            ).values("value")
+        )
+        return self.update(
+            reviews_count=Coalesce(reviews_count, 0),
+            reviews_stars_sum=Coalesce(reviews_stars_sum, 0),
+            reviews_star_average=Coalesce(reviews_star_average, 0.0),
+            updated_at=timezone.now(),
+        )
+
+    def refresh_search_vector(self):
+        authors = (
+            Author.objects.filter(books=models.OuterRef("pk"))
+            .values("books")
+            .annotate(
+                names=StringAgg(
+                    Concat("first_name", models.Value(" "), "last_name"),
+                    delimiter=" ",
+                )
+            )
+            .values("names")
+        )
+        categories = (
+            Category.objects.filter(books=models.OuterRef("pk"))
+            .values("books")
+            .annotate(names=StringAgg("name", delimiter=" "))
+            .values("names")
+        )
+        publication = Publication.objects.filter(
+            pk=models.OuterRef("publication")
+        ).values("name")
+
+        return self.update(
+            search_vector=(
+                SearchVector("title", "isbn", weight="A")
+                + SearchVector(models.Subquery(authors), weight="B")
+                + SearchVector(
+                    models.Subquery(categories),
+                    models.Subquery(publication),
+                    weight="C",
+                )
+                + SearchVector("summary", weight="D")
+            ),
+            # renamed authors, categories and publications change what the
+            # book matches without touching the book itself.
+            updated_at=timezone.now(),
+        )
+
+
 class Book(models.Model):
     class Meta:
         indexes = [
@@ -164,8 +322,39 @@ class Book(models.Model):
                 fields=["language"],
                 name="book_language_index",
             ),
+            models.Index(
+                fields=["pages", "id"],
+                name="book_pages_id_index",
+            ),
+            models.Index(
+                fields=["publish_date", "id"],
+                name="book_publish_date_id_index",
+            ),
+            models.Index(
+                fields=["reviews_star_average", "id"],
+                name="book_star_average_id_index",
+            ),
+            models.Index(
+                fields=["copies_available", "id"],
+                name="book_copies_available_id_index",
+            ),
+            models.Index(
+                fields=["updated_at"],
+                name="book_updated_at_index",
+            ),
+            GinIndex(
+                fields=["search_vector"],
+                name="book_search_vector_index",
+            ),
+            GinIndex(
+                fields=["title"],
+                opclasses=["gin_trgm_ops"],
+                name="book_title_trgm_index",
+            ),
         ]
 
+    objects = BookQuerySet.as_manager()
+
     LANGUAGE_CHOICES = (
         ("en", "English"),
         ("zh", "Chinese"),
@@ -231,10 +420,43 @@ class Book(models.Model):
         default="en",
     )
 
-    @property
-    def reviews_star_average(self):
-        stars_average = self.reviews.aggregate(models.Avg("stars", default=0))
-        return stars_average["stars__avg"]
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    reviews_stars_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    reviews_star_average = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="Average review stars, maintained on every review change.",
+    )
+
+    copies_total = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+    )
+
+    copies_available = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Copies currently on the shelf, maintained on every circulation change.",
+    )
+
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text="Weighted full-text document of the book, see refresh_search_vector.",
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="Last change to the book's representation, including its counters.",
+    )
 
     @property
     def full_title(self):
@@ -256,6 +478,14 @@ class BorrowedManager(models.Manager):
         return super().get_queryset().filter(status="B")
 
 
+class OverdueManager(models.Manager):
+    # served by b-instance_overdue_index, which only covers borrowed copies.
+    def get_queryset(self):
+        return (
+            super().get_queryset().filter(status="B", due_date__lt=timezone.localdate())
+        )
+
+
 class BookInstance(models.Model):
     class Meta:
         constraints = [
@@ -275,11 +505,17 @@ class BookInstance(models.Model):
                 fields=["book", "borrower"],
                 name="b-instance_book_borrower_index",
             ),
+            models.Index(
+                fields=["due_date"],
+                condition=models.Q(status="B"),
+                name="b-instance_overdue_index",
+            ),
         ]
 
     objects = models.Manager()
     available = AvailableManager()
     borrowed = BorrowedManager()
+    overdue = OverdueManager()
 
     BORROW_STATUS = (
         ("A", "Available"),
@@ -315,21 +551,76 @@ class BookInstance(models.Model):
 
     @property
     def is_overdue(self):
-        return self.due_date and due_date < datetime.date.today()
+        return (
+            self.status == "B"
+            and self.due_date is not None
+            and self.due_date < timezone.localdate()
+        )
 
     def __str__(self):
         return f"{self.book} borrowed by {self.borrower}"
 
 
+class ReservationQuerySet(models.QuerySet):
+    def with_position(self):
+        ahead = (
+            BookReservation.objects.filter(book=models.OuterRef("book"))
+            .filter(
+                models.Q(created__lt=models.OuterRef("created"))
+                | models.Q(
+                    created=models.OuterRef("created"), id__lt=models.OuterRef("id")
+                )
+            )
+            .values("book")
+            .annotate(value=models.Count("id"))
+            .values("value")
+        )
+        return self.annotate(position=Coalesce(models.Subquery(ahead), 0) + 1)
+
+    def pop_head(self, book):
+        # deletes the oldest reservation on the book and returns its borrower
+        # in a single statement, locked heads are skipped so concurrent
+        # returns of the same title serve consecutive reservations.
+        table = self.model._meta.db_table
+        skip_locked = ""
+        if connection.features.has_select_for_update_skip_locked:
+            skip_locked = " FOR UPDATE SKIP LOCKED"
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                DELETE FROM {table} WHERE id = (
+                    SELECT id FROM {table} WHERE book_id = %s
+                    ORDER BY created, id LIMIT 1{skip_locked}
+                ) RETURNING borrower_id
+                """,
+                [book.pk],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
 class BookReservation(models.Model):
     class Meta:
+        ordering = ["created", "id"]
+
+        constraints = [
+            models.UniqueConstraint(
+                "book",
+                "borrower",
+                name="b-reservation_unique_book_borrower",
+            )
+        ]
+
         indexes = [
             models.Index(
-                fields=["id", "book"],
-                name="b-reservation_id_book",
+                fields=["book", "created", "id"],
+                name="b-reservation_queue_index",
             ),
         ]
 
+    objects = ReservationQuerySet.as_manager()
+
     book = models.ForeignKey(
         to="Book",
         on_delete=models.CASCADE,
@@ -342,10 +633,132 @@ class BookReservation(models.Model):
         related_name="reservations",
     )
 
+    created = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Time the reservation joined the queue of the book.",
+    )
+
     def __str__(self):
         return f"{self.book} to be borrowed by {self.borrower}"
 
 
+class LoanEventQuerySet(models.QuerySet):
+    def between(self, start, end):
+        # a range on the partition key, only the partitions of the range are scanned.
+        return self.filter(created__gte=start, created__lt=end)
+
+    def loans_per_book(self):
+        # borrows and hand-offs are the two ways a loan starts.
+        return (
+            self.filter(action__in=("B", "H"))
+            .values("book")
+            .annotate(loans=models.Count("id"))
+            .order_by("-loans", "book")
+        )
+
+    def counts_per_day(self):
+        return (
+            self.annotate(day=TruncDate("created"))
+            .values("day", "action")
+            .annotate(count=models.Count("id"))
+            .order_by("day", "action")
+        )
+
+    def record_copies(self, copies, action):
+        # copies the current loan of the selected copies into the history
+        # with one INSERT ... SELECT, so copies claimed by an UPDATE don't
+        # have to be read back first.
+        sql, params = copies.values(
+            "book", "pk", "borrower", "due_date"
+        ).query.sql_with_params()
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (book_id, copy_id, borrower_id, due_date, action, created)
+                SELECT copies.*, %s, %s FROM ({sql}) AS copies
+                """,
+                [action, timezone.now(), *params],
+            )
+            return cursor.rowcount
+
+
+# Append only history of the circulation, written in the transaction of each
+# state change. The table is partitioned by month on `created` (see migration
+# 0012 and the create_loan_event_partitions command), its primary key is
+# (id, created) and it has no foreign keys, so rows outlive the copies, books
+# and users they mention and old months can be dropped as a whole.
+class LoanEvent(models.Model):
+    class Meta:
+        db_table = "loan_event"
+
+        indexes = [
+            models.Index(
+                fields=["created"],
+                name="loan_event_created_index",
+            ),
+            models.Index(
+                fields=["book", "created"],
+                name="loan_event_book_created_index",
+            ),
+        ]
+
+    objects = LoanEventQuerySet.as_manager()
+
+    ACTIONS = (
+        ("B", "Borrowed"),
+        ("R", "Returned"),
+        ("H", "Handed off"),
+    )
+
+    book = models.ForeignKey(
+        to="Book",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+
+    copy = models.ForeignKey(
+        to="BookInstance",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+
+    borrower = models.ForeignKey(
+        to=user_model,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+
+    action = models.CharField(
+        max_length=1,
+        choices=ACTIONS,
+    )
+
+    due_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Due date of the loan the event belongs to.",
+    )
+
+    created = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+    )
+
+    def __str__(self):
+        return (
+            f"{self.book_id} {self.get_action_display().lower()} by {self.borrower_id}"
+        )
+
+
 class Review(models.Model):
     class Meta:
         indexes = [
@@ -375,5 +788,23 @@ class Review(models.Model):
         help_text="Write your review here.",
     )
 
+    def save(self, *args, **kwargs):
+        # deletions are handled by the post_delete receiver in signals.py,
+        # which also covers reviews removed by cascades.
+        with transaction.atomic():
+            if self.pk is not None:
+                previous = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("book", "stars")
+                    .first()
+                )
+                if previous is not None:
+                    Book.objects.filter(pk=previous["book"]).update_rating(
+                        -1, -previous["stars"]
+                    )
+            super().save(*args, **kwargs)
+            Book.objects.filter(pk=self.book_id).update_rating(1, self.stars)
+
     def __str__(self):
         return f"{self.book} reviewed by {self.reviewer}"
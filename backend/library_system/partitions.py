@@ -0,0 +1,109 @@
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from library_system.models import LoanEvent
+
+
+# Monthly range partitions of the loan history, named loan_event_pYYYY_MM and
+# bounded by midnight of the first day of the month in the current time zone.
+table = LoanEvent._meta.db_table
+default_partition = f"{table}_default"
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def get_bounds(month):
+    start = timezone.make_aware(datetime.datetime(month.year, month.month, 1))
+    next_month = add_months(month, 1)
+    end = timezone.make_aware(datetime.datetime(next_month.year, next_month.month, 1))
+    return start, end
+
+
+def get_partition_name(month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def get_partitions():
+    # maps the month of each existing partition to its table name.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f"{table}_p"
+    partitions = {}
+    for name in names:
+        if name.startswith(prefix):
+            month = datetime.datetime.strptime(name[len(prefix) :], "%Y_%m").date()
+            partitions[month] = name
+    return partitions
+
+
+def create_partition(month):
+    name = get_partition_name(month)
+    start, end = get_bounds(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # a partition can't be created while the default partition holds rows
+        # of its range, those are moved over with the default one detached.
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default_partition} WHERE created >= %s AND created < %s)",
+            [start, end],
+        )
+        misplaced = cursor.fetchone()[0]
+        if misplaced:
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default_partition}")
+
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+        if misplaced:
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {default_partition}
+                    WHERE created >= %s AND created < %s RETURNING *
+                ) INSERT INTO {name} SELECT * FROM moved
+                """,
+                [start, end],
+            )
+            cursor.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {default_partition} DEFAULT"
+            )
+    return name
+
+
+def create_partitions(first_month, last_month):
+    existing = get_partitions()
+    created = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        if month not in existing:
+            created.append(create_partition(month))
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partitions(before):
+    # drops whole months, which is how the history is trimmed, rows are
+    # never deleted one by one.
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for month, name in sorted(get_partitions().items()):
+            if add_months(month, 1) <= before:
+                cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    return dropped
@@ -0,0 +1,99 @@
+import csv
+import json
+import itertools
+
+from asgiref.sync import sync_to_async
+
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+
+from library_system.models import BookInstance
+
+
+REPORT_FORMATS = ("csv", "ndjson")
+OVERDUE_FIELDS = (
+    "copy",
+    "book",
+    "title",
+    "borrower",
+    "email",
+    "due_date",
+    "days_overdue",
+)
+
+
+class EchoBuffer:
+    # csv.writer only writes to files, this hands each line back instead.
+    def write(self, value):
+        return value
+
+
+def iter_overdue(chunk_size=2000):
+    today = timezone.localdate()
+    rows = BookInstance.overdue.values_list(
+        "pk",
+        "book_id",
+        "book__title",
+        "borrower_id",
+        "borrower__email",
+        "due_date",
+    )
+    for row in iter_chunks(rows, chunk_size):
+        yield (*row, (today - row[-1]).days)
+
+
+def iter_chunks(rows, chunk_size):
+    # iterator() reads through a server side cursor on PostgreSQL, rows are
+    # fetched chunk by chunk and never held all at once.
+    if not connections[rows.db].settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        yield from rows.order_by("due_date", "pk").iterator(chunk_size=chunk_size)
+        return
+
+    # without them (behind a transaction pooler) the rows are paged by
+    # (due_date, pk) instead, each page is a range scan of the overdue index.
+    last = None
+    while True:
+        page = rows.order_by("due_date", "pk")
+        if last is not None:
+            page = page.filter(
+                Q(due_date__gt=last[-1]) | Q(due_date=last[-1], pk__gt=last[0])
+            )
+        page = list(page[:chunk_size])
+        yield from page
+        if len(page) < chunk_size:
+            return
+        last = page[-1]
+
+
+def render_csv(rows):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(OVERDUE_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(OVERDUE_FIELDS, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def render_overdue(report_format, chunk_size=2000):
+    rows = iter_overdue(chunk_size)
+    if report_format == "csv":
+        return render_csv(rows)
+    return render_ndjson(rows)
+
+
+async def arender_overdue(report_format, chunk_size=2000):
+    # StreamingHttpResponse reads a sync iterator to the end before sending
+    # anything under ASGI, this pulls one chunk of lines at a time instead,
+    # each in the request's thread that holds the cursor.
+    lines = render_overdue(report_format, chunk_size)
+    next_chunk = sync_to_async(lambda: list(itertools.islice(lines, chunk_size)))
+    while True:
+        chunk = await next_chunk()
+        if not chunk:
+            return
+        yield "".join(chunk)
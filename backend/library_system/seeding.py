@@ -0,0 +1,438 @@
+import json
+import hashlib
+import random
+import datetime
+import itertools
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Max
+from django.core.management.color import no_style
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.caching import bump_version
+
+from user_auth.models import ResetToken, OutgoingEmail
+
+from library_system.models import (
+    Author,
+    Category,
+    Publication,
+    Book,
+    BookInstance,
+    BookReservation,
+    LoanEvent,
+    Review,
+)
+from library_system.circulation import LOAN_PERIOD
+
+
+user_model = get_user_model()
+
+SEED_PASSWORD = "synthetic-reader"
+SEED_WRITERS = ("auto", "copy", "bulk")
+
+# fmt: off
+TITLE_WORDS = (
+    "shadow", "river", "empire", "garden", "winter", "secret", "machine",
+    "ocean", "silent", "crown", "forest", "glass", "storm", "memory", "city",
+    "night", "stone", "mirror", "fire", "journey", "island", "kingdom",
+    "letters", "summer", "dragon", "history", "harbor", "light", "war", "song",
+)
+FIRST_NAMES = (
+    "Ada", "Boris", "Chen", "Dana", "Elif", "Farid", "Grace", "Hiro", "Ines",
+    "Jonas", "Kira", "Liam", "Maya", "Nour", "Omar", "Priya", "Rosa", "Sven",
+)
+LAST_NAMES = (
+    "Abbott", "Bauer", "Costa", "Dubois", "Eriksen", "Fischer", "Garcia",
+    "Haddad", "Ivanova", "Jensen", "Kowalski", "Lopez", "Moreau", "Nakamura",
+)
+CATEGORY_NAMES = (
+    "Fantasy", "Mystery", "History", "Science", "Poetry", "Biography",
+    "Travel", "Romance", "Philosophy", "Horror", "Economics", "Art",
+)
+# fmt: on
+
+
+def next_id(model):
+    return (model.objects.aggregate(value=Max("pk"))["value"] or 0) + 1
+
+
+def reset_sequences(models):
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class BulkCreateWriter:
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+
+    def write(self, model, rows):
+        # the default manager of the named models writes their slugs.
+        manager = model._default_manager
+        rows = iter(rows)
+        count = 0
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                return count
+            manager.bulk_create(chunk)
+            count += len(chunk)
+
+
+def encode_copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class CopyStream:
+    # file-like object COPY reads from, rows are encoded as they're read so
+    # only one buffer of them is ever held in memory.
+    def __init__(self, lines):
+        self.lines = lines
+        self.buffer = b""
+        self.count = 0
+
+    def read(self, size=-1):
+        chunks = [self.buffer]
+        length = len(self.buffer)
+        for line in self.lines:
+            chunks.append(line)
+            length += len(line)
+            self.count += 1
+            if 0 <= size <= length:
+                break
+        data = b"".join(chunks)
+        if size < 0:
+            size = len(data)
+        self.buffer = data[size:]
+        return data[:size]
+
+
+class CopyWriter:
+    # Streams rows into COPY ... FROM STDIN in PostgreSQL's text format, a
+    # single statement per call however many rows there are. Rows without
+    # an id get theirs from the sequence.
+
+    def write(self, model, rows):
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return 0
+
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not (field.primary_key and first.pk is None)
+        ]
+        # the connection proxy costs a lookup per use, it's resolved once.
+        database = connections[DEFAULT_DB_ALIAS]
+        stream = CopyStream(
+            self.encode_row(row, fields, database)
+            for row in itertools.chain([first], rows)
+        )
+        quote_name = database.ops.quote_name
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        with database.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN",
+                stream,
+            )
+        return stream.count
+
+    def encode_row(self, row, fields, database):
+        if hasattr(row, "create_slug") and not row.slug:
+            row.slug = row.create_slug(row.pk)
+
+        values = []
+        for field in fields:
+            value = field.pre_save(row, add=True)
+            if field.get_internal_type() == "JSONField":
+                value = json.dumps(value, cls=field.encoder)
+            else:
+                value = field.get_db_prep_save(value, database)
+            values.append(encode_copy_value(value))
+        return ("\t".join(values) + "\n").encode("utf-8")
+
+
+def get_writer(name, chunk_size):
+    # COPY is PostgreSQL only, other databases get chunked bulk_create.
+    if name == "copy" or (name == "auto" and connection.vendor == "postgresql"):
+        return CopyWriter()
+    return BulkCreateWriter(chunk_size)
+
+
+class CatalogSeeder:
+    # Writes a synthetic catalog with ids chosen up front, so the rows of
+    # every model can be generated without reading back what was written,
+    # through COPY on PostgreSQL or bulk_create elsewhere (see get_writer).
+    # The same seed and sizes always produce the same data, books are
+    # generated and written a chunk at a time with their copies, loans and
+    # loan history, reservations and reviews, and their counters filled in.
+
+    def __init__(
+        self,
+        seed=0,
+        users=200,
+        authors=200,
+        categories=12,
+        publications=50,
+        books=1000,
+        copies_per_book=3,
+        reviews_per_book=2,
+        reservations_per_book=2,
+        loan_ratio=0.3,
+        reset_tokens=20,
+        emails=50,
+        chunk_size=1000,
+        writer=None,
+    ):
+        self.random_seed = seed
+        self.random = random.Random(seed)
+        self.sizes = {
+            "users": users,
+            "authors": authors,
+            "categories": categories,
+            "publications": publications,
+            "books": books,
+            "reset_tokens": reset_tokens,
+            "emails": emails,
+        }
+        self.copies_per_book = copies_per_book
+        self.reviews_per_book = reviews_per_book
+        self.reservations_per_book = reservations_per_book
+        self.loan_ratio = loan_ratio
+        self.chunk_size = chunk_size
+        self.writer = writer or BulkCreateWriter(chunk_size)
+        self.stats = {}
+
+    def seed(self):
+        self.now = timezone.now()
+        self.today = timezone.localdate()
+
+        with transaction.atomic():
+            self.usernames = self.write(user_model, self.generate_users())
+            self.write(ResetToken, self.generate_reset_tokens())
+            self.write(OutgoingEmail, self.generate_emails())
+            self.author_ids = self.write(Author, self.generate_authors())
+            self.category_ids = self.write(Category, self.generate_categories())
+            self.publication_ids = self.write(Publication, self.generate_publications())
+
+        first_book_id = next_id(Book)
+        first_copy_id = next_id(BookInstance)
+        book_ids = range(first_book_id, first_book_id + self.sizes["books"])
+        for start in range(0, len(book_ids), self.chunk_size):
+            with transaction.atomic():
+                first_copy_id = self.seed_books(
+                    book_ids[start : start + self.chunk_size], first_copy_id
+                )
+
+        reset_sequences(
+            [
+                Author,
+                Category,
+                Publication,
+                Book,
+                BookInstance,
+                BookReservation,
+                Review,
+                OutgoingEmail,
+            ]
+        )
+        for model in (Author, Category, Publication, Book):
+            bump_version(model)
+        return self.stats
+
+    def write(self, model, rows):
+        rows = list(rows)
+        self.count(model, self.writer.write(model, rows))
+        return [row.pk for row in rows]
+
+    def count(self, model, value):
+        key = model._meta.model_name
+        self.stats[key] = self.stats.get(key, 0) + value
+
+    def generate_users(self):
+        offset = user_model.objects.count()
+        password = make_password(SEED_PASSWORD)
+        for number in range(offset, offset + self.sizes["users"]):
+            yield user_model(
+                username=f"reader{number}",
+                email=f"reader{number}@example.com",
+                password=password,
+                date_joined=self.now,
+            )
+
+    def generate_reset_tokens(self):
+        # a user has one token at most, some of them already expired.
+        taken = set(ResetToken.objects.values_list("user", flat=True))
+        usernames = [name for name in self.usernames if name not in taken]
+        for username in self.sample(usernames, self.sizes["reset_tokens"]):
+            yield ResetToken(
+                # users hold one token at most, so theirs is derived from them.
+                reset_token=hashlib.sha1(
+                    f"{self.random_seed}:{username}".encode("utf-8"),
+                    usedforsecurity=False,
+                ).hexdigest(),
+                user_id=username,
+                expire_time=self.now
+                + datetime.timedelta(minutes=self.random.randint(-120, 30)),
+            )
+
+    def generate_emails(self):
+        # half of the outbox is already sent, the rest waits for the worker.
+        for number in range(self.sizes["emails"]):
+            username = self.random.choice(self.usernames)
+            created = self.now - datetime.timedelta(minutes=self.random.randint(0, 600))
+            sent = number % 2 == 0
+            yield OutgoingEmail(
+                subject="Password Reset",
+                message=f"Reset link for {username}.",
+                recipients=[f"{username}@example.com"],
+                created=created,
+                send_after=created,
+                sent_at=created if sent else None,
+                attempts=1 if sent else 0,
+            )
+
+    def generate_authors(self):
+        first_id = next_id(Author)
+        for pk in range(first_id, first_id + self.sizes["authors"]):
+            # the id keeps generated names unique across runs.
+            yield Author(
+                pk=pk,
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=f"{self.random.choice(LAST_NAMES)} {pk}",
+            )
+
+    def generate_categories(self):
+        first_id = next_id(Category)
+        for pk in range(first_id, first_id + self.sizes["categories"]):
+            yield Category(pk=pk, name=f"{self.random.choice(CATEGORY_NAMES)} {pk}")
+
+    def generate_publications(self):
+        first_id = next_id(Publication)
+        for pk in range(first_id, first_id + self.sizes["publications"]):
+            yield Publication(
+                pk=pk, name=f"{self.random.choice(LAST_NAMES)} Press {pk}"
+            )
+
+    def seed_books(self, book_ids, copy_id):
+        books, book_authors, book_categories = [], [], []
+        copies, reservations, reviews, events = [], [], [], []
+
+        for pk in book_ids:
+            title = " ".join(self.random.sample(TITLE_WORDS, 3)).title()
+            book = Book(
+                pk=pk,
+                isbn=f"979{pk:010d}",
+                title=title,
+                summary=f"A story of {title.lower()}.",
+                pages=self.random.randint(80, 900),
+                edition=self.random.randint(1, 5),
+                publish_date=self.today
+                - datetime.timedelta(days=self.random.randint(0, 365 * 60)),
+                language=self.random.choice(Book.LANGUAGE_CHOICES)[0],
+                publication_id=self.random.choice(self.publication_ids),
+                updated_at=self.now,
+            )
+            books.append(book)
+
+            for author_id in self.sample(self.author_ids, self.random.randint(1, 3)):
+                book_authors.append(
+                    Book.authors.through(book_id=pk, author_id=author_id)
+                )
+            for category_id in self.sample(
+                self.category_ids, self.random.randint(1, 2)
+            ):
+                book_categories.append(
+                    Book.categories.through(book_id=pk, category_id=category_id)
+                )
+
+            readers = self.sample(
+                self.usernames,
+                self.copies_per_book + self.reservations_per_book,
+            )
+            loans = min(round(self.copies_per_book * self.loan_ratio), len(readers))
+            for index in range(self.copies_per_book):
+                instance = BookInstance(pk=copy_id, book_id=pk)
+                copy_id += 1
+                if index < loans:
+                    instance.borrower_id = readers[index]
+                    instance.status = "B"
+                    # about a third of the loans end up overdue.
+                    instance.due_date = self.today + datetime.timedelta(
+                        days=self.random.randint(-10, 21)
+                    )
+                    events.append(
+                        LoanEvent(
+                            book_id=pk,
+                            copy_id=instance.pk,
+                            borrower_id=instance.borrower_id,
+                            action="B",
+                            due_date=instance.due_date,
+                            created=self.now
+                            - (LOAN_PERIOD - (instance.due_date - self.today)),
+                        )
+                    )
+                copies.append(instance)
+
+            # only books without a free copy have a queue.
+            if loans == self.copies_per_book:
+                for minutes, username in enumerate(readers[loans:], start=1):
+                    reservations.append(
+                        BookReservation(
+                            book_id=pk,
+                            borrower_id=username,
+                            created=self.now - datetime.timedelta(minutes=minutes),
+                        )
+                    )
+
+            for username in self.sample(self.usernames, self.reviews_per_book):
+                stars = self.random.randint(1, 5)
+                reviews.append(
+                    Review(
+                        book_id=pk,
+                        reviewer_id=username,
+                        stars=stars,
+                        review_text=f"{stars} stars for {title}.",
+                    )
+                )
+                book.reviews_count += 1
+                book.reviews_stars_sum += stars
+            if book.reviews_count:
+                book.reviews_star_average = book.reviews_stars_sum / book.reviews_count
+            book.copies_total = self.copies_per_book
+            book.copies_available = self.copies_per_book - loans
+
+        for model, rows in (
+            (Book, books),
+            (Book.authors.through, book_authors),
+            (Book.categories.through, book_categories),
+            (BookInstance, copies),
+            (BookReservation, reservations),
+            (Review, reviews),
+            (LoanEvent, events),
+        ):
+            self.count(model, self.writer.write(model, rows))
+
+        if connection.vendor == "postgresql":
+            Book.objects.filter(pk__in=book_ids).refresh_search_vector()
+        return copy_id
+
+    def sample(self, population, count):
+        return self.random.sample(population, min(count, len(population)))
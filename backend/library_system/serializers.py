@@ -1,7 +1,13 @@
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
 from rest_framework import serializers
 from rest_framework.validators import ValidationError
 
-from library_system import models
+from library_system import models, circulation
+from library_system.importer import IMPORT_FORMATS
 
 
 class EmptySerializer(serializers.BaseSerializer):
@@ -37,6 +43,9 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
             "url",
             "full_title",
             "reviews_star_average",
+            "reviews_count",
+            "copies_total",
+            "copies_available",
             "title",
             "edition",
             "isbn",
@@ -48,7 +57,14 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
             "publish_date",
             "language",
         )
-        read_only_fields = ("url", "full_title", "reviews_star_average")
+        read_only_fields = (
+            "url",
+            "full_title",
+            "reviews_star_average",
+            "reviews_count",
+            "copies_total",
+            "copies_available",
+        )
         write_only_fields = ("title", "edition")
 
 
@@ -81,10 +97,13 @@ class BookCreationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         copies_count = validated_data.pop("copies_count")
         book_data = validated_data
-        book = super().create(book_data)
+        book_data["copies_total"] = copies_count
+        book_data["copies_available"] = copies_count
+        with transaction.atomic():
+            book = super().create(book_data)
 
-        instances = [models.BookInstance(book=book) for _ in range(copies_count)]
-        models.BookInstance.objects.bulk_create(instances)
+            instances = [models.BookInstance(book=book) for _ in range(copies_count)]
+            models.BookInstance.objects.bulk_create(instances)
 
         return book
 
@@ -99,12 +118,69 @@ class BookCopiesSerializer(serializers.Serializer):
 
     def update(self, instance, validated_data):
         copies_count = validated_data.pop("copies_count")
-        instances = [models.BookInstance(book=instance) for _ in range(copies_count)]
-        models.BookInstance.objects.bulk_create(instances)
+        circulation.add_copies(instance, copies_count)
 
         return instance
 
 
+class CirculationOperationSerializer(serializers.Serializer):
+    book = serializers.IntegerField()
+    user = serializers.CharField(max_length=150)
+    action = serializers.ChoiceField(choices=("borrow", "return"))
+
+
+class BulkCirculationSerializer(serializers.Serializer):
+    operations = CirculationOperationSerializer(
+        many=True, allow_empty=False, max_length=500
+    )
+
+
+class CatalogImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=IMPORT_FORMATS, default="csv")
+
+
+class ReservationSerializer(serializers.HyperlinkedModelSerializer):
+    class Meta:
+        model = models.BookReservation
+        fields = ("book", "created", "position")
+        read_only_fields = ("book", "created")
+
+    position = serializers.IntegerField(read_only=True)
+
+
+class LoanPeriodSerializer(serializers.Serializer):
+    # a range of whole days, the current month up to today by default.
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+
+    def validate(self, data):
+        today = timezone.localdate()
+        data.setdefault("since", today.replace(day=1))
+        data.setdefault("until", today)
+        if data["since"] > data["until"]:
+            raise ValidationError({"Period": "since must not be after until."})
+
+        data["start"] = timezone.make_aware(
+            datetime.datetime.combine(data["since"], datetime.time())
+        )
+        data["end"] = timezone.make_aware(
+            datetime.datetime.combine(
+                data["until"] + datetime.timedelta(days=1), datetime.time()
+            )
+        )
+        return data
+
+
+class PopularBookSerializer(serializers.HyperlinkedModelSerializer):
+    class Meta:
+        model = models.Book
+        fields = ("url", "isbn", "title", "loans")
+
+    loans = serializers.IntegerField(read_only=True)
+
+
 class ReviewSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = models.Review
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, m2m_changed
+from django.dispatch import receiver
+
+from core.caching import bump_version
+
+from library_system.models import Author, Category, Publication, Book, Review
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    Book.objects.filter(pk=instance.book_id).update_rating(-1, -instance.stars)
+
+
+@receiver(post_save, sender=Book)
+def refresh_book_search_vector(sender, instance, **kwargs):
+    Book.objects.filter(pk=instance.pk).refresh_search_vector()
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.categories.through)
+def refresh_linked_books_search_vector(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            Book.objects.filter(pk=instance.pk).refresh_search_vector()
+        return
+
+    # reverse clears don't receive the affected books, collect them beforehand.
+    if action == "pre_clear":
+        instance._cleared_book_pks = list(instance.books.values_list("pk", flat=True))
+    elif action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_book_pks", [])
+
+    if action in ("post_add", "post_remove", "post_clear") and pk_set:
+        Book.objects.filter(pk__in=pk_set).refresh_search_vector()
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Publication)
+def refresh_named_books_search_vector(sender, instance, created, **kwargs):
+    if not created:
+        instance.books.all().refresh_search_vector()
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Publication)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Publication)
+@receiver(post_delete, sender=Book)
+def expire_cached_responses(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(sender))
@@ -0,0 +1,213 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase
+
+from core.caching import get_cache
+from core.pagination import KeysetPagination
+
+from library_system.models import (
+    Author,
+    Category,
+    Publication,
+    Book,
+    BookReservation,
+    LoanEvent,
+)
+
+
+user_model = get_user_model()
+
+
+class BookQueryBudgetTests(APITestCase):
+    # the validator lookup, the page of books and one prefetch for each of
+    # authors and categories, however many books are rendered.
+    list_queries = 4
+    detail_queries = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = user_model.objects.create_user(
+            username="reader", email="reader@example.com", password="reader-password"
+        )
+        cls.publication = Publication.objects.create(name="Publisher")
+        cls.authors = [
+            Author.objects.create(first_name="First", last_name=f"Author {index}")
+            for index in range(3)
+        ]
+        cls.categories = [
+            Category.objects.create(name=f"Category {index}") for index in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create_books(self, count):
+        first = Book.objects.count()
+        books = Book.objects.bulk_create(
+            Book(
+                isbn=f"{index:013d}",
+                title=f"Book {index}",
+                summary="A book.",
+                publication=self.publication,
+            )
+            for index in range(first, first + count)
+        )
+        for book in books:
+            book.authors.set(self.authors)
+            book.categories.set(self.categories)
+        return books
+
+    def get_list(self):
+        with self.assertNumQueries(self.list_queries):
+            response = self.client.get(reverse("book-list"))
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_list_queries_do_not_grow_with_the_page(self):
+        self.create_books(2)
+        self.assertEqual(len(self.get_list()), 2)
+
+        self.create_books(KeysetPagination.page_size)
+        results = self.get_list()
+        self.assertEqual(len(results), KeysetPagination.page_size)
+        self.assertEqual(len(results[0]["authors"]), len(self.authors))
+        self.assertEqual(len(results[0]["categories"]), len(self.categories))
+
+    def test_detail_queries(self):
+        book = self.create_books(1)[0]
+        with self.assertNumQueries(self.detail_queries):
+            response = self.client.get(reverse("book-detail", args=[book.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["authors"]), len(self.authors))
+
+    def test_list_etag_changes_when_a_book_is_deleted(self):
+        books = self.create_books(2)
+        etag = self.client.get(reverse("book-list"))["ETag"]
+        response = self.client.get(reverse("book-list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            books[0].delete()
+        response = self.client.get(reverse("book-list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+
+class ReadQueryBudgetTests(APITestCase):
+    # every read endpoint other than the book list and detail, each list is
+    # requested at two sizes so a query per row fails the budget. Cached
+    # responses are dropped first, a miss is the most a request may cost.
+    page_queries = 1
+    detail_queries = 1
+    reservations_queries = 1
+    popular_queries = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = user_model.objects.create_user(
+            username="librarian",
+            email="librarian@example.com",
+            password="librarian-password",
+            is_staff=True,
+        )
+        cls.publication = Publication.objects.create(name="Publisher")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, queries):
+        get_cache().clear()
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def create_books(self, count):
+        first = Book.objects.count()
+        return Book.objects.bulk_create(
+            Book(
+                isbn=f"{index:013d}",
+                title=f"Book {index}",
+                summary="A book.",
+                publication=self.publication,
+            )
+            for index in range(first, first + count)
+        )
+
+    def create_users(self, count):
+        first = user_model.objects.count()
+        return [
+            user_model.objects.create_user(
+                username=f"reader{index}",
+                email=f"reader{index}@example.com",
+                password="reader-password",
+            )
+            for index in range(first, first + count)
+        ]
+
+    def assertListBudget(self, url_name, create):
+        create(2)
+        first = self.get(reverse(url_name), self.page_queries)["results"]
+        create(KeysetPagination.page_size)
+        results = self.get(reverse(url_name), self.page_queries)["results"]
+        self.assertGreater(len(results), len(first))
+
+    def test_named_lists_and_details(self):
+        builders = {
+            Author: lambda index: Author(
+                first_name="First", last_name=f"Author {index}"
+            ),
+            Category: lambda index: Category(name=f"Category {index}"),
+            Publication: lambda index: Publication(name=f"Publication {index}"),
+        }
+        for model, build in builders.items():
+            name = model._meta.model_name
+            with self.subTest(name):
+
+                def create(count):
+                    first = model.objects.count()
+                    for index in range(first, first + count):
+                        build(index).save()
+
+                self.assertListBudget(f"{name}-list", create)
+                url = reverse(f"{name}-detail", args=[model.objects.first().pk])
+                self.get(url, self.detail_queries)
+
+    def test_users(self):
+        users = []
+        self.assertListBudget(
+            "user-list", lambda count: users.extend(self.create_users(count))
+        )
+        self.get(reverse("user-detail", args=[users[0].pk]), self.detail_queries)
+
+    def test_reservations(self):
+        # the position of each reservation is a subquery of the same query.
+        def reserve(count):
+            for book in self.create_books(count):
+                BookReservation.objects.create(book=book, borrower=self.user)
+                for user in self.create_users(1):
+                    BookReservation.objects.create(book=book, borrower=user)
+
+        reserve(2)
+        first = self.get(reverse("book-reservations"), self.reservations_queries)
+        reserve(KeysetPagination.page_size)
+        results = self.get(reverse("book-reservations"), self.reservations_queries)
+        self.assertGreater(len(results["results"]), len(first["results"]))
+        self.assertEqual(results["results"][0]["position"], 1)
+
+    def test_popular(self):
+        def lend(count):
+            for book in self.create_books(count):
+                LoanEvent.objects.create(
+                    book_id=book.pk, copy_id=0, borrower_id=self.user.pk, action="B"
+                )
+
+        lend(2)
+        self.assertEqual(
+            len(self.get(reverse("book-popular"), self.popular_queries)["results"]), 2
+        )
+        lend(8)
+        self.assertEqual(
+            len(self.get(reverse("book-popular"), self.popular_queries)["results"]), 10
+        )
@@ -1,8 +1,15 @@
-import datetime
+import io
+
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.http import StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 
 from rest_framework import status, filters
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.mixins import (
@@ -12,11 +19,19 @@ from rest_framework.mixins import (
     DestroyModelMixin,
 )
 
-from knox.auth import TokenAuthentication
-
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core.caching import CachedResponseMixin, ConditionalResponseMixin, get_version
+
+from user_auth.authentication import (
+    CachedTokenAuthentication,
+    SignedCredentialAuthentication,
+)
+
+from library_system import circulation
 from library_system.filters import BookFilter
+from library_system.importer import CatalogImporter
+from library_system.reports import REPORT_FORMATS, arender_overdue, render_overdue
 from library_system.permissions import IsOwnerOrStaff
 from library_system.models import (
     Author,
@@ -25,6 +40,7 @@ from library_system.models import (
     Book,
     BookInstance,
     BookReservation,
+    LoanEvent,
     Review,
 )
 from library_system.serializers import (
@@ -35,69 +51,128 @@ from library_system.serializers import (
     BookSerializer,
     BookCreationSerializer,
     BookCopiesSerializer,
+    BulkCirculationSerializer,
+    CatalogImportSerializer,
+    ReservationSerializer,
+    LoanPeriodSerializer,
+    PopularBookSerializer,
     ReviewSerializer,
 )
 
 
 class AuthorViewSet(
+    CachedResponseMixin,
     GenericViewSet,
     ListModelMixin,
     CreateModelMixin,
     RetrieveModelMixin,
     DestroyModelMixin,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
     permission_classes = [IsAdminUser, IsAuthenticated]
     serializer_class = AuthorSerializer
     queryset = Author.objects.all()
 
 
 class CategoryViewSet(
+    CachedResponseMixin,
     GenericViewSet,
     ListModelMixin,
     CreateModelMixin,
     RetrieveModelMixin,
     DestroyModelMixin,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
     permission_classes = [IsAdminUser, IsAuthenticated]
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
 
 
 class PublicationViewSet(
+    CachedResponseMixin,
     GenericViewSet,
     ListModelMixin,
     CreateModelMixin,
     RetrieveModelMixin,
     DestroyModelMixin,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
     permission_classes = [IsAdminUser, IsAuthenticated]
     serializer_class = PublicationSerializer
     queryset = Publication.objects.all()
 
 
 class BookViewSet(
+    ConditionalResponseMixin,
     GenericViewSet,
     ListModelMixin,
     CreateModelMixin,
     RetrieveModelMixin,
 ):
-    authentication_classes = [TokenAuthentication]
-    queryset = Book.objects.all()
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
+    queryset = Book.objects.defer("search_vector")
 
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = BookFilter
-    ordering_fields = ["pages", "publish_date", "reviews_star_average"]
+    ordering_fields = [
+        "pages",
+        "publish_date",
+        "reviews_star_average",
+        "copies_available",
+    ]
 
     def get_permissions(self):
-        if self.action in ("create", "update"):
+        if self.action in (
+            "create",
+            "update",
+            "bulk_circulation",
+            "import_catalog",
+            "overdue",
+            "circulation_stats",
+        ):
             permission_classes = [IsAdminUser, IsAuthenticated]
         else:
             permission_classes = [IsAuthenticated]
         return [perm() for perm in permission_classes]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            # the hyperlinked relations only need primary keys, fetch them for
+            # the whole page at once instead of once per book.
+            queryset = queryset.prefetch_related(
+                Prefetch("authors", queryset=Author.objects.only("pk")),
+                Prefetch("categories", queryset=Category.objects.only("pk")),
+            )
+        return queryset
+
+    def get_list_atomic(self):
+        # fuzzy searches set their trigram threshold for the transaction the
+        # page is read in, see BookFilter.filter_fuzzy_search.
+        if "fuzzy_search" in self.request.query_params:
+            return transaction.atomic(using=self.get_queryset().db)
+        return None
+
+    def list(self, request, *args, **kwargs):
+        atomic = self.get_list_atomic()
+        if atomic is None:
+            return super().list(request, *args, **kwargs)
+        with atomic:
+            return super().list(request, *args, **kwargs)
+
+    def get_list_state(self, request):
+        # any change to a listed book moves the newest updated_at, which is
+        # read from the end of book_updated_at_index. Deletions don't, they
+        # bump the cached version of Book instead, see signals.
+        updated_at = Book.objects.aggregate(value=Max("updated_at"))["value"]
+        if updated_at is None:
+            return None
+        return [updated_at.isoformat(), get_version(Book)]
+
+    def get_object_last_modified(self, request):
+        updated_at = Book.objects.values_list("updated_at", flat=True)
+        return get_object_or_404(updated_at, pk=self.kwargs["pk"])
+
     def get_serializer_class(self):
         if self.action == "create":
             serializer_class = BookCreationSerializer
@@ -108,65 +183,131 @@ class BookViewSet(
     @action(methods=["post"], detail=True, serializer_class=EmptySerializer)
     def borrow_book(self, request, pk=None):
         book = self.get_object()
-        user = request.user
+        result, status_code = circulation.borrow_book(book, request.user)
+        return Response(result, status=status_code)
 
-        if BookInstance.objects.filter(book=book, borrower=user).exists():
-            return Response(
-                {"Error": "user already borrowed a copy of this book."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    @action(methods=["post"], detail=True, serializer_class=EmptySerializer)
+    def return_book(self, request, pk=None):
+        book = self.get_object()
+        result, status_code = circulation.return_book(book, request.user)
+        return Response(result, status=status_code)
 
-        available_books = BookInstance.available.filter(book=book)
-        if available_books.count() > 0:
-            instance = available_books.all()[0]
-            instance.borrower = user
-            instance.due_date = datetime.datetime.now() + datetime.timedelta(days=21)
-            instance.status = "B"
-            instance.save()
-            return Response(
-                {"Success": "user has borrowed a copy of this book."},
-                status=status.HTTP_200_OK,
-            )
+    @action(methods=["post"], detail=False, serializer_class=BulkCirculationSerializer)
+    def bulk_circulation(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = circulation.apply_operations(serializer.validated_data["operations"])
+        return Response({"results": results}, status=status.HTTP_200_OK)
 
-        if BookReservation.objects.filter(book=book, borrower=user).exists():
-            return Response(
-                {"Error": "user has already placed a reservation on this book."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    @action(
+        methods=["post"],
+        detail=False,
+        serializer_class=CatalogImportSerializer,
+        parser_classes=[MultiPartParser],
+    )
+    def import_catalog(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        reservation = BookReservation(book=book, borrower=user)
-        reservation.save()
-        return Response(
-            {"Success": "user has placed a reservation order on this book."},
-            status=status.HTTP_201_CREATED,
+        upload = serializer.validated_data["file"]
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        stats = CatalogImporter().import_stream(
+            stream, serializer.validated_data["format"]
         )
+        return Response(stats, status=status.HTTP_201_CREATED)
 
-    @action(methods=["post"], detail=True, serializer_class=EmptySerializer)
-    def return_book(self, request, pk=None):
-        book = self.get_object()
-        user = request.user
+    @action(methods=["get"], detail=False, serializer_class=ReservationSerializer)
+    def reservations(self, request):
+        queryset = BookReservation.objects.filter(borrower=request.user)
+        page = self.paginate_queryset(queryset.with_position())
+        serializer = self.serializer_class(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
 
-        if not BookInstance.objects.filter(book=book, borrower=user).exists():
+    @action(methods=["get"], detail=False, serializer_class=EmptySerializer)
+    def overdue(self, request):
+        # `format` is taken by the renderer negotiation, hence `output`.
+        report_format = request.query_params.get("output", "csv")
+        if report_format not in REPORT_FORMATS:
             return Response(
-                {"Error": "user hasn't borrowed a copy of this book."},
+                {"Error": f"output must be one of {', '.join(REPORT_FORMATS)}."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        reservations = book.reservations
-        instance = BookInstance.objects.filter(book=book, borrower=user)[0]
-        if reservations.count() > 0:
-            first_reservation = reservations[0]
-            instance.borrower = first_reservation.borrower
-            instance.due_date = datetime.datetime.now() + datetime.timedelta(days=21)
-            first_reservation.delete()
+        if isinstance(request._request, ASGIRequest):
+            content = arender_overdue(report_format)
         else:
-            instance.borrower = None
-            instance.due_date = None
-            instance.status = "A"
-        instance.save()
+            content = render_overdue(report_format)
+        content_type = "text/csv" if report_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="overdue.{report_format}"'
+        return response
+
+    @action(methods=["get"], detail=False, serializer_class=PopularBookSerializer)
+    def popular(self, request):
+        # counted from the loan history, BookInstance only knows current loans.
+        period = LoanPeriodSerializer(data=request.query_params)
+        period.is_valid(raise_exception=True)
+        period = period.validated_data
+
+        counts = list(
+            LoanEvent.objects.between(period["start"], period["end"])
+            .loans_per_book()
+            .values_list("book", "loans")[: period["limit"]]
+        )
+        books = Book.objects.only("isbn", "title").in_bulk(
+            [book_pk for book_pk, _ in counts]
+        )
+        popular = []
+        for book_pk, loans in counts:
+            # the history keeps the loans of books deleted since.
+            book = books.get(book_pk)
+            if book is not None:
+                book.loans = loans
+                popular.append(book)
+
+        serializer = self.serializer_class(
+            popular, many=True, context=self.get_serializer_context()
+        )
+        return Response(
+            {
+                "since": period["since"],
+                "until": period["until"],
+                "results": serializer.data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @action(methods=["get"], detail=False, serializer_class=LoanPeriodSerializer)
+    def circulation_stats(self, request):
+        period = self.serializer_class(data=request.query_params)
+        period.is_valid(raise_exception=True)
+        period = period.validated_data
+
+        names = {
+            action: name.lower().replace(" ", "_") for action, name in LoanEvent.ACTIONS
+        }
+        totals = dict.fromkeys(names.values(), 0)
+        days = {}
+        for row in LoanEvent.objects.between(
+            period["start"], period["end"]
+        ).counts_per_day():
+            day = days.setdefault(row["day"], {"day": row["day"], **totals})
+            day[names[row["action"]]] = row["count"]
+        for day in days.values():
+            for name in names.values():
+                totals[name] += day[name]
 
         return Response(
-            {"Success": "user returned the borrowed copy of the book."},
+            {
+                "since": period["since"],
+                "until": period["until"],
+                "totals": totals,
+                "days": list(days.values()),
+            },
             status=status.HTTP_200_OK,
         )
 
@@ -188,7 +329,7 @@ class ReviewViewSet(
     CreateModelMixin,
     RetrieveModelMixin,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
     permission_classes = [IsAuthenticated, IsOwnerOrStaff]
     serializer_class = ReviewSerializer
     queryset = Review.objects.all()
@@ -1,9 +1,28 @@
+import copy
+import time
 import base64
+import binascii
+import threading
 
+from collections import OrderedDict
+
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.contrib.auth import get_user_model, authenticate
 
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework.authentication import BasicAuthentication, get_authorization_header
+from django.core import signing
+from rest_framework.authentication import (
+    BaseAuthentication,
+    BasicAuthentication,
+    get_authorization_header,
+)
+
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.settings import knox_settings
+
+from core.settings import TOKEN_CACHE_SETTINGS, SIGNED_CREDENTIAL_SETTINGS
 
 UserModel = get_user_model()
 
@@ -102,3 +121,143 @@ class EmailAuthentication(AuthenticationMixin, BasicAuthentication):
             raise AuthenticationFailed("User inactive or deleted.")
 
         return (user, None)
+
+
+class TokenCache:
+    # LRU of validated token digests to (user, auth token), local to the
+    # worker process. Entries live at most `ttl` seconds, which bounds how
+    # long another worker keeps a token after it's invalidated here.
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(digest, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, digest, user, auth_token):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl
+        if auth_token.expiry is not None:
+            remaining = (auth_token.expiry - timezone.now()).total_seconds()
+            expires = min(expires, time.monotonic() + remaining)
+
+        with self.lock:
+            self.entries[digest] = (expires, user, auth_token)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self.lock:
+            self.entries.pop(digest, None)
+
+    def discard_user(self, user_pk):
+        with self.lock:
+            for digest, (_, user, _) in list(self.entries.items()):
+                if user.pk == user_pk:
+                    del self.entries[digest]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=TOKEN_CACHE_SETTINGS["max_size"],
+    ttl=TOKEN_CACHE_SETTINGS["ttl"],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # knox looks the token up by prefix, compares digests, clears the user's
+    # expired tokens and loads the user on every request, a cache hit costs
+    # one digest and no queries. Entries are dropped by the receivers in
+    # user_auth/signals.py when a token is deleted or its user is saved.
+
+    def authenticate_credentials(self, token):
+        try:
+            digest = hash_token(token.decode("utf-8"))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            raise AuthenticationFailed("Invalid token.")
+
+        cached = token_cache.get(digest)
+        if cached is not None:
+            user, auth_token = cached
+            if knox_settings.AUTO_REFRESH and auth_token.expiry:
+                self.renew_token(auth_token)
+            return copy.copy(user), copy.copy(auth_token)
+
+        user, auth_token = super().authenticate_credentials(token)
+        token_cache.set(digest, user, auth_token)
+        return user, auth_token
+
+
+def create_signed_credential(user):
+    # the session auth hash is derived from the password hash, changing the
+    # password invalidates every credential issued before.
+    return signing.dumps(
+        [user.pk, user.get_session_auth_hash()],
+        salt=SIGNED_CREDENTIAL_SETTINGS["salt"],
+    )
+
+
+class SignedCredentialAuthentication(BaseAuthentication):
+    # Verifies the short lived credential issued by the auth/session/ endpoint
+    # with an HMAC check and a primary key lookup, instead of running the
+    # password hasher like the username/email authenticators do.
+    auth_type = b"signed"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.auth_type:
+            return None
+
+        if len(auth) == 1:
+            msg = "Invalid signed header. No credentials provided."
+            raise AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = "Invalid signed header. Credentials string should not contain spaces."
+            raise AuthenticationFailed(msg)
+
+        return self.authenticate_credentials(auth[1])
+
+    def authenticate_credentials(self, credential):
+        try:
+            user_pk, session_hash = signing.loads(
+                credential.decode("utf-8"),
+                salt=SIGNED_CREDENTIAL_SETTINGS["salt"],
+                max_age=SIGNED_CREDENTIAL_SETTINGS["max_age"],
+            )
+        except signing.SignatureExpired:
+            raise AuthenticationFailed("Credential expired.")
+        except (signing.BadSignature, UnicodeDecodeError, TypeError, ValueError):
+            raise AuthenticationFailed("Invalid credential.")
+
+        user = UserModel.objects.filter(pk=user_pk).first()
+        if user is None or not constant_time_compare(
+            session_hash, user.get_session_auth_hash()
+        ):
+            raise AuthenticationFailed("Invalid credential.")
+
+        if not user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+
+        return (user, None)
+
+    def authenticate_header(self, request):
+        return "Signed"
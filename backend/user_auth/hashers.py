@@ -0,0 +1,9 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from core.settings import PASSWORD_HASHER_SETTINGS
+
+
+class ProfiledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # same algorithm name as Django's hasher, so existing hashes verify and
+    # are re-encoded with the configured iterations by must_update.
+    iterations = PASSWORD_HASHER_SETTINGS["pbkdf2_iterations"]
@@ -0,0 +1,73 @@
+import time
+import statistics
+
+from django.contrib.auth.hashers import get_hasher, get_hashers
+from django.core.management.base import BaseCommand
+
+from user_auth.hashers import ProfiledPBKDF2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the configured password hashers and suggest a PBKDF2 iteration "
+        "count for a target login cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=5,
+            help="Number of hashes timed per hasher.",
+        )
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=100.0,
+            help="Wanted duration of a single password check in milliseconds.",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            nargs="*",
+            default=[],
+            help="Extra PBKDF2 iteration counts to time.",
+        )
+
+    def handle(self, *args, **options):
+        rounds = options["rounds"]
+        for hasher in get_hashers():
+            self.report(hasher.algorithm, hasher, rounds)
+
+        for iterations in options["iterations"]:
+            hasher = ProfiledPBKDF2PasswordHasher()
+            hasher.iterations = iterations
+            self.report(f"pbkdf2_sha256 x {iterations}", hasher, rounds)
+
+        # PBKDF2 cost grows linearly with the iteration count.
+        hasher = get_hasher("pbkdf2_sha256")
+        milliseconds = self.time_hasher(hasher, rounds)
+        suggested = int(hasher.iterations * options["target_ms"] / milliseconds)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"PBKDF2_ITERATIONS={suggested} costs about "
+                f"{options['target_ms']:.0f}ms per check on this machine, "
+                f"the current {hasher.iterations} costs {milliseconds:.1f}ms."
+            )
+        )
+
+    def report(self, name, hasher, rounds):
+        try:
+            milliseconds = self.time_hasher(hasher, rounds)
+        except (ValueError, ImportError):
+            self.stdout.write(f"{name}: unavailable, its library is not installed.")
+            return
+        self.stdout.write(f"{name}: {milliseconds:.1f}ms per hash")
+
+    def time_hasher(self, hasher, rounds):
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            hasher.encode("benchmark-password", hasher.salt())
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,107 @@
+import time
+
+from django.db import models
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from knox.models import AuthToken
+
+from core.settings import TOKEN_PURGE_SETTINGS
+
+from user_auth.models import ResetToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired auth and reset tokens, and tokens over the per user "
+        "cap, in small batches so no statement holds its locks for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=TOKEN_PURGE_SETTINGS["batch_size"],
+            help="Number of rows deleted per statement.",
+        )
+        parser.add_argument(
+            "--max-tokens-per-user",
+            type=int,
+            default=TOKEN_PURGE_SETTINGS["max_tokens_per_user"],
+            help="Keep only the newest tokens of each user, 0 keeps them all.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches, to leave room for other writes.",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.pause = options["pause"]
+        started = time.monotonic()
+        now = timezone.now()
+
+        expired_tokens = self.purge(
+            AuthToken.objects.filter(expiry__lt=now).order_by("expiry")
+        )
+        expired_reset_tokens = self.purge(
+            ResetToken.objects.filter(expire_time__lt=now).order_by("expire_time")
+        )
+
+        capped_tokens = 0
+        max_tokens = options["max_tokens_per_user"]
+        if max_tokens > 0:
+            capped_tokens = self.purge_over_cap(max_tokens)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {expired_tokens} expired auth tokens, "
+                f"{expired_reset_tokens} expired reset tokens and "
+                f"{capped_tokens} auth tokens over the per user cap "
+                f"in {elapsed:.2f}s."
+            )
+        )
+
+    def purge(self, queryset):
+        # the batch is selected through the index and deleted by primary key,
+        # each delete commits on its own.
+        deleted = 0
+        while True:
+            pks = list(queryset.values_list("pk", flat=True)[: self.batch_size])
+            if not pks:
+                return deleted
+            deleted += self.delete(queryset.model, pks)
+
+    def purge_over_cap(self, max_tokens):
+        # the users over the cap are found in a single pass over the
+        # (user_id, created) index, then the tokens past the newest ones of
+        # each user are read from the same index once and deleted in batches.
+        users = list(
+            AuthToken.objects.values("user")
+            .annotate(count=models.Count("pk"))
+            .filter(count__gt=max_tokens)
+            .values_list("user", flat=True)
+        )
+        deleted = 0
+        pks = []
+        for user in users:
+            pks.extend(
+                AuthToken.objects.filter(user=user)
+                .order_by("-created")
+                .values_list("pk", flat=True)[max_tokens:]
+            )
+            while len(pks) >= self.batch_size:
+                deleted += self.delete(AuthToken, pks[: self.batch_size])
+                pks = pks[self.batch_size :]
+        if pks:
+            deleted += self.delete(AuthToken, pks)
+        return deleted
+
+    def delete(self, model, pks):
+        _, deleted_per_model = model.objects.filter(pk__in=pks).delete()
+        if self.pause:
+            time.sleep(self.pause)
+        return deleted_per_model.get(model._meta.label, 0)
@@ -0,0 +1,128 @@
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+from core.settings import EMAIL_OUTBOX_SETTINGS
+
+from user_auth.models import OutgoingEmail
+
+
+def get_retry_delay(attempts):
+    delay = EMAIL_OUTBOX_SETTINGS["retry_delay"] * 2 ** (attempts - 1)
+    return min(delay, EMAIL_OUTBOX_SETTINGS["max_retry_delay"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the queued emails in batches over one mail connection, "
+        "failed emails are retried with exponential backoff until they run "
+        "out of attempts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=EMAIL_OUTBOX_SETTINGS["batch_size"],
+            help="Number of emails claimed and sent per transaction.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it's drained.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds between polls of an empty outbox with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.connection = get_connection()
+        self.counts = dict.fromkeys(("sent", "retried", "given_up"), 0)
+        try:
+            while True:
+                if self.send_batch():
+                    continue
+                if not options["loop"]:
+                    break
+                # drop the mail connection while idle, servers time it out.
+                self.connection.close()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.connection.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {self.counts['sent']} emails, {self.counts['retried']} "
+                f"failed and rescheduled, {self.counts['given_up']} failed "
+                "for good."
+            )
+        )
+
+    def send_batch(self):
+        # skip locked lets several workers drain the outbox side by side.
+        with transaction.atomic():
+            emails = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    sent_at__isnull=True,
+                    failed_at__isnull=True,
+                    send_after__lte=timezone.now(),
+                )
+                .order_by("send_after", "id")[: self.batch_size]
+            )
+            if not emails:
+                return 0
+
+            for email in emails:
+                if email.attempts >= EMAIL_OUTBOX_SETTINGS["max_attempts"]:
+                    # queued before max_attempts was lowered.
+                    self.give_up(email)
+                    continue
+                try:
+                    self.connection.open()
+                    EmailMessage(
+                        subject=email.subject,
+                        body=email.message,
+                        from_email=email.from_email or None,
+                        to=email.recipients,
+                        connection=self.connection,
+                    ).send()
+                except Exception as error:
+                    # a broken connection is reopened for the next email.
+                    self.connection.close()
+                    email.attempts += 1
+                    email.last_error = f"{type(error).__name__}: {error}"
+                    if email.attempts >= EMAIL_OUTBOX_SETTINGS["max_attempts"]:
+                        self.give_up(email)
+                    else:
+                        email.send_after = timezone.now() + get_retry_delay(
+                            email.attempts
+                        )
+                        self.counts["retried"] += 1
+                else:
+                    email.attempts += 1
+                    email.sent_at = timezone.now()
+                    self.counts["sent"] += 1
+
+            OutgoingEmail.objects.bulk_update(
+                emails, ["attempts", "last_error", "send_after", "sent_at", "failed_at"]
+            )
+        return len(emails)
+
+    def give_up(self, email):
+        # out of the pending index for good, the error stays on the row.
+        email.failed_at = timezone.now()
+        self.counts["given_up"] += 1
+        self.stderr.write(
+            f"Giving up on email {email.pk} to {', '.join(email.recipients)} "
+            f"after {email.attempts} attempts: {email.last_error}"
+        )
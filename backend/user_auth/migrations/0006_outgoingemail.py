@@ -0,0 +1,65 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user_auth", "0005_remove_resettoken_creation_time_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutgoingEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=200)),
+                ("message", models.TextField()),
+                (
+                    "from_email",
+                    models.CharField(
+                        blank=True,
+                        help_text="Defaults to DEFAULT_FROM_EMAIL when empty.",
+                        max_length=254,
+                    ),
+                ),
+                ("recipients", models.JSONField()),
+                (
+                    "created",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                (
+                    "send_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="The worker skips the email until this time, pushed back after failures.",
+                    ),
+                ),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "verbose_name": "Outgoing Email",
+                "db_table": "outgoing_email",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("sent_at__isnull", True)),
+                        fields=["send_after", "id"],
+                        name="outgoing_email_pending_index",
+                    )
+                ],
+            },
+        ),
+    ]
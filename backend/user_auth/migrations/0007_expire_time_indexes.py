@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-18 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user_auth", "0006_outgoingemail"),
+        ("knox", "0008_remove_authtoken_salt"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="resettoken",
+            index=models.Index(
+                fields=["expire_time"], name="reset_token_expire_time_index"
+            ),
+        ),
+        # knox's table is owned by a third party app, its indexes for the
+        # purge command are created here.
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS knox_authtoken_expiry_index ON knox_authtoken (expiry)",
+            reverse_sql="DROP INDEX IF EXISTS knox_authtoken_expiry_index",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX IF NOT EXISTS knox_authtoken_user_created_index ON knox_authtoken (user_id, created)",
+            reverse_sql="DROP INDEX IF EXISTS knox_authtoken_user_created_index",
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user_auth", "0007_expire_time_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="outgoingemail",
+            name="outgoing_email_pending_index",
+        ),
+        migrations.AddField(
+            model_name="outgoingemail",
+            name="failed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set once every attempt failed, the worker gives up on the email.",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outgoingemail",
+            index=models.Index(
+                condition=models.Q(
+                    ("failed_at__isnull", True), ("sent_at__isnull", True)
+                ),
+                fields=["send_after", "id"],
+                name="outgoing_email_pending_index",
+            ),
+        ),
+    ]
@@ -1,10 +1,9 @@
 import os
 import binascii
 
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.contrib.auth.models import AbstractUser
 
 from user_auth.validators import validate_username, validate_email, validate_password
@@ -12,7 +11,7 @@ from core.settings import RESET_TOKEN_SETTINGS, HOST_SETTINGS
 
 
 def get_full_url(relative):
-    return f"{HOST_SETTINGS.get('protocol')}://{HOST_SETTINGS.get('domain')}:{HOST_SETTINGS.get('port')}{url}"
+    return f"{HOST_SETTINGS.get('protocol')}://{HOST_SETTINGS.get('domain')}:{HOST_SETTINGS.get('site_port')}{relative}"
 
 
 class User(AbstractUser):
@@ -75,7 +74,10 @@ class User(AbstractUser):
         msg = "User demoted."
         return {"Success": msg}
 
+    @transaction.atomic
     def send_password_reset_email(self):
+        # the mail is queued in the same transaction as the token and sent
+        # by the send_queued_email worker, the request never waits on SMTP.
         reset_token, created = ResetToken.objects.get_or_create(user=self)
         if not created or reset_token.is_expired:
             return False
@@ -85,11 +87,10 @@ class User(AbstractUser):
         message = f"Hello,\n\n\
         We've received a password reset request for this email. Here is the link to reset the password:\n\n\
         {get_full_url(url)}"
-        send_mail(
+        OutgoingEmail.objects.create(
             subject=subject,
-            from_email=None,
             message=message,
-            recipient_list=[self.email],
+            recipients=[self.email],
         )
         return True
 
@@ -101,6 +102,7 @@ class ResetToken(models.Model):
 
         indexes = [
             models.Index(fields=["user"], name="reset_token_user_index"),
+            models.Index(fields=["expire_time"], name="reset_token_expire_time_index"),
         ]
 
     reset_token = models.CharField(
@@ -141,3 +143,63 @@ class ResetToken(models.Model):
     def is_expired(self):
         current_time = timezone.now()
         return self.expire_time < current_time
+
+
+class OutgoingEmail(models.Model):
+    class Meta:
+        verbose_name = "Outgoing Email"
+        db_table = "outgoing_email"
+
+        indexes = [
+            models.Index(
+                fields=["send_after", "id"],
+                condition=models.Q(sent_at__isnull=True, failed_at__isnull=True),
+                name="outgoing_email_pending_index",
+            ),
+        ]
+
+    subject = models.CharField(
+        max_length=200,
+    )
+
+    message = models.TextField()
+
+    from_email = models.CharField(
+        max_length=254,
+        blank=True,
+        help_text="Defaults to DEFAULT_FROM_EMAIL when empty.",
+    )
+
+    recipients = models.JSONField()
+
+    created = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+    )
+
+    send_after = models.DateTimeField(
+        default=timezone.now,
+        help_text="The worker skips the email until this time, pushed back after failures.",
+    )
+
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    failed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set once every attempt failed, the worker gives up on the email.",
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+    )
+
+    last_error = models.TextField(
+        blank=True,
+    )
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)}"
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from knox.models import AuthToken
+
+from user_auth.models import User
+from user_auth.authentication import token_cache
+
+
+@receiver(post_delete, sender=AuthToken)
+def discard_cached_token(sender, instance, **kwargs):
+    token_cache.discard(instance.digest)
+
+
+# password changes, deactivation and any other change to the user drop its
+# cached tokens, the next request loads the user again.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_cached_user_tokens(sender, instance, **kwargs):
+    token_cache.discard_user(instance.pk)
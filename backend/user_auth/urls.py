@@ -10,6 +10,8 @@ router.register("", views.UserAuthViewSet, basename="user")
 auth_patterns = [
     path("login/", views.LoginView.as_view(), name="user-login"),
     path("logout/", views.LogoutView.as_view(), name="user-logout"),
+    path("logoutall/", views.LogoutAllView.as_view(), name="user-logout-all"),
+    path("session/", views.SessionCredentialView.as_view(), name="user-session"),
     path("", include(router.urls)),
 ]
 
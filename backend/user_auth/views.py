@@ -1,6 +1,8 @@
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from rest_framework import status
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
@@ -11,10 +13,19 @@ from rest_framework.mixins import (
     UpdateModelMixin,
 )
 
-from knox.auth import TokenAuthentication
-from knox.views import LoginView, LogoutView
+from knox import views as knox_views
+from knox.views import LoginView
+
+from core.settings import SIGNED_CREDENTIAL_SETTINGS
 
 from user_auth.models import ResetToken
+from user_auth.authentication import (
+    CachedTokenAuthentication,
+    SignedCredentialAuthentication,
+    UsernameAuthentication,
+    EmailAuthentication,
+    create_signed_credential,
+)
 from user_auth.serializers import (
     UserSerializer,
     EmailChangeSerializer,
@@ -31,13 +42,38 @@ from user_auth.permissions import (
 UserModel = get_user_model()
 
 
+class LogoutView(knox_views.LogoutView):
+    authentication_classes = [CachedTokenAuthentication]
+
+
+class LogoutAllView(knox_views.LogoutAllView):
+    authentication_classes = [CachedTokenAuthentication]
+
+
+class SessionCredentialView(APIView):
+    # exchanges username/email credentials for a signed credential, so the
+    # password hasher runs once per session instead of once per request.
+    authentication_classes = [UsernameAuthentication, EmailAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        expiry = timezone.now() + SIGNED_CREDENTIAL_SETTINGS["max_age"]
+        return Response(
+            {
+                "credential": create_signed_credential(request.user),
+                "expiry": expiry,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class UserAuthViewSet(
     GenericViewSet,
     ListModelMixin,
     RetrieveModelMixin,
     DestroyModelMixin,
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedCredentialAuthentication]
     serializer_class = UserSerializer
     queryset = UserModel.objects.all()
 